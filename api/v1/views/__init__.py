@@ -5,12 +5,11 @@ from flask import Blueprint
 
 app_views = Blueprint('app_views', __name__, url_prefix='/api/v1')
 
-if __name__ == "__init__":
-    from api.v1.views import index
-    from api.v1.views import states
-    from api.v1.views import cities
-    from api.v1.views import amenities
-    from api.v1.views import users
-    from api.v1.views import places
-    from api.v1.views import places_reviews
-    from api.v1.views import places_amenities
+from api.v1.views import index  # noqa: E402
+from api.v1.views import states  # noqa: E402
+from api.v1.views import cities  # noqa: E402
+from api.v1.views import amenities  # noqa: E402
+from api.v1.views import users  # noqa: E402
+from api.v1.views import places  # noqa: E402
+from api.v1.views import places_reviews  # noqa: E402
+from api.v1.views import places_amenities  # noqa: E402
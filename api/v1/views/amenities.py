@@ -4,6 +4,7 @@
 from flask import abort, jsonify, request
 from models.amenity import Amenity
 from api.v1.views import app_views
+from api.v1.views.pagination import paginate, stream
 from models import storage
 
 
@@ -11,8 +12,10 @@ from models import storage
 @app_views.route('/amenities', methods=['GET'], strict_slashes=False)
 def get_amenities():
     """Retrieves the list of all Amenity objects"""
-    amenities = storage.all(Amenity).values()
-    return jsonify([amenity.to_dict() for amenity in amenities])
+    page = paginate(Amenity)
+    if page is not None:
+        return page
+    return stream(storage.each(Amenity))
 
 
 # Retrieves a Amenity object: GET /api/v1/amenities/<amenity_id>
@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 """ Cities app view"""
 from api.v1.views import app_views
+from api.v1.views.pagination import paginate, stream
 from flask import jsonify, abort, make_response, request
 from models import storage
 from models.city import City
@@ -12,13 +13,10 @@ def all_cities(state_id):
     # Check that the state_id actually exists
     if not storage.get("State", state_id):
         abort(404)
-
-    cities_list = []
-    cities = storage.get("State", state_id).cities
-    # Convert city instances to dictionaries and add to the list
-    for city in cities:
-        cities_list.append(city.to_dict())
-    return jsonify(cities_list)
+    page = paginate(City, {"state_id": state_id})
+    if page is not None:
+        return page
+    return stream(storage.each(City, {"state_id": state_id}))
 
 
 @app_views.route("/cities/<city_id>")
@@ -79,5 +77,5 @@ def update_city(city_id):
         else:
             setattr(city, k, v)
 
-    storage.save()
+    city.save()
     return make_response(jsonify(city.to_dict()), 200)
@@ -6,6 +6,16 @@ from api.v1.views import app_views
 from flask import jsonify
 from models import storage
 
+# JSON key of each model counted by /stats
+stats_classes = {
+    "amenities": "Amenity",
+    "cities": "City",
+    "places": "Place",
+    "reviews": "Review",
+    "states": "State",
+    "users": "User"
+}
+
 
 @app_views.route("/status")
 def status_ok():
@@ -22,15 +32,8 @@ def obj_stats():
     Defines a route for '/stats' that
     returns JSON response with counts of various objects
     """
-    # Count the number of instances for each model
-    # and store in a dictionary
-    objs = {
-        "amenities": storage.count("Amenity"),
-        "cities": storage.count("City"),
-        "places": storage.count("Place"),
-        "reviews": storage.count("Review"),
-        "states": storage.count("State"),
-        "users": storage.count("User")
-    }
+    # Count the instances of every model in a single storage call
+    counts = storage.count_many(stats_classes.values())
+    objs = {key: counts[name] for key, name in stats_classes.items()}
     # Return the dictionary as a JSON response
     return jsonify(objs)
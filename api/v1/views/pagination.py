@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+"""
+Keyset pagination and streaming of the collection endpoints
+
+A request with a limit and/or an after query parameter gets a page of
+at most limit objects, sorted by created_at then id, as
+{"results": [...], "next": <cursor>}; next is the after parameter of
+the following page, null on the last one. A request with neither gets
+the whole collection streamed as a JSON list, or as one JSON object
+per line if it accepts application/x-ndjson rather than JSON.
+"""
+import base64
+import binascii
+from flask import abort, jsonify, request, Response, stream_with_context
+import json
+from models import storage
+from models.base_model import format_time, parse_time
+import os
+
+# the columns of the keyset
+order = ["created_at", "id"]
+# integers - page size without a limit parameter, largest page size
+default_limit = int(os.getenv("HBNB_API_PAGE_SIZE", "100"))
+max_limit = int(os.getenv("HBNB_API_MAX_PAGE_SIZE", "1000"))
+# integer - characters of a streamed response sent together
+chunk_size = 65536
+
+
+def encode_cursor(obj):
+    """returns the cursor of the page following obj"""
+    keyset = json.dumps([format_time(obj.created_at), obj.id])
+    return base64.urlsafe_b64encode(keyset.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """returns the (created_at, id) keyset of cursor"""
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(
+            cursor.encode()))
+        created_at = parse_time(created_at)
+    except (binascii.Error, TypeError, ValueError):
+        abort(400, 'Invalid cursor')
+    # the stored times are naive, the ids strings: neither compares with
+    # an aware time or another type
+    if created_at.tzinfo is not None or type(id) is not str:
+        abort(400, 'Invalid cursor')
+    return created_at, id
+
+
+def paginate(cls, where=None):
+    """
+    Returns the response listing the page of the objects of cls matching
+    the dictionary where (see storage.query) the request asks for, or
+    None if it asks for no page
+    """
+    if "limit" not in request.args and "after" not in request.args:
+        return None
+    try:
+        limit = int(request.args.get("limit", default_limit))
+    except ValueError:
+        abort(400, 'Invalid limit')
+    if not 0 < limit <= max_limit:
+        abort(400, 'Invalid limit')
+    after = request.args.get("after")
+    if after is not None:
+        after = decode_cursor(after)
+    # one more object tells whether there is a next page
+    objs = storage.query(cls, where=where, order_by=order, limit=limit + 1,
+                         after=after)
+    cursor = encode_cursor(objs[limit - 1]) if len(objs) > limit else None
+    return jsonify({"results": [obj.to_dict() for obj in objs[:limit]],
+                    "next": cursor})
+
+
+def chunks(parts):
+    """yields the strings of parts joined in chunks of about chunk_size"""
+    buffer, size = [], 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream(objs):
+    """
+    Returns the response sending the dictionaries of the objects of the
+    iterable objs as they are serialized, as a JSON list or as NDJSON
+    """
+    mimetype = request.accept_mimetypes.best_match(
+        ["application/json", "application/x-ndjson"], "application/json")
+
+    def ndjson():
+        """yields one line per object"""
+        for obj in objs:
+            yield json.dumps(obj.to_dict()) + "\n"
+
+    def array():
+        """yields the JSON list of the objects, piece by piece"""
+        separator = "["
+        for obj in objs:
+            yield separator
+            yield json.dumps(obj.to_dict())
+            separator = ","
+        yield "[]" if separator == "[" else "]"
+
+    parts = ndjson() if mimetype == "application/x-ndjson" else array()
+    # the request context stays open until the last chunk is sent; the
+    # objects of storage.each come through a session of their own, as
+    # the teardown removes the one of the request before
+    return Response(stream_with_context(chunks(parts)), mimetype=mimetype)
@@ -4,11 +4,11 @@
 from flask import abort, jsonify, request
 from models.city import City
 from models.place import Place
-from models.state import State
 from models.user import User
 from models.amenity import Amenity
 from api.v1.views import app_views
-from models import storage
+from api.v1.views.pagination import paginate, stream
+from models import storage, storage_t
 
 
 # Retrieves the list of all Place objects of a City:
@@ -21,9 +21,11 @@ def get_city_places(city_id):
     # Return 404 error if the City object is not found
     if city is None:
         abort(404)
-    # Otherwise, retrieve and return the list of Place objects in JSON format
-    places = [place.to_dict() for place in city.places]
-    return jsonify(places)
+    page = paginate(Place, {"city_id": city_id})
+    if page is not None:
+        return page
+    # Otherwise, stream the list of Place objects in JSON format
+    return stream(storage.each(Place, {"city_id": city_id}))
 
 
 # Retrieves a Place object: GET /api/v1/places/<place_id>
@@ -138,36 +140,34 @@ def places_search():
 
     # Get the JSON data from the request
     search_data = request.get_json()
+    if not isinstance(search_data, dict):
+        abort(400, 'Not a JSON')
 
     # Extract the lists of State, City, and Amenity ids
-    states = search_data.get('states', [])
-    cities = search_data.get('cities', [])
-    amenities = search_data.get('amenities', [])
-
-    # Retrieve all places if the JSON body is empty
-    # or all lists are empty
-    if not states and not cities and not amenities:
-        places = storage.all(Place).values()
-    else:
-        places = set()
-
-        # Include all places for each State id listed
-        for state_id in states:
-            state = storage.get(State, state_id)
-            if state:
-                places.update(state.places)
-
-        # Include all places for each City id listed
-        for city_id in cities:
-            city = storage.get(City, city_id)
-            if city:
-                places.update(city.places)
-
-        # Filter places if amenities list is not empty
-        if amenities:
-            places = [place for place in places if
-                      all(amenity.id in place.amenities_ids
-                          for amenity_id in amenities)]
-
-    # Return the list of places in JSON format
-    return jsonify([place.to_dict() for place in places])
+    states = search_data.get('states') or []
+    cities = search_data.get('cities') or []
+    amenities = search_data.get('amenities') or []
+    for ids in (states, cities, amenities):
+        if not isinstance(ids, list) or \
+                not all(isinstance(id, str) for id in ids):
+            abort(400, 'Not a list of ids')
+
+    # The places of the cities listed and of the cities of the states
+    # listed, every place if there are none, having all the amenities
+    # listed: each condition is an index lookup of the storage
+    where = {}
+    if states or cities:
+        city_ids = set(cities)
+        if states:
+            city_ids.update(city.id for city in
+                            storage.each(City, {"state_id": states}))
+        where["city_id"] = city_ids
+    if amenities:
+        where["amenities" if storage_t == 'db' else "amenity_ids"] = \
+            amenities
+
+    # Return a page, or the list, of places in JSON format
+    page = paginate(Place, where)
+    if page is not None:
+        return page
+    return stream(storage.each(Place, where))
@@ -8,7 +8,7 @@ from flask import abort, jsonify
 from models.place import Place
 from models.amenity import Amenity
 from api.v1.views import app_views
-from models import storage
+from models import storage, storage_t
 
 
 # Retrieves the list of all Amenity objects of a Place
@@ -21,11 +21,12 @@ def get_place_amenities(place_id):
     if place is None:
         abort(404)
 
-    if storage_type == 'db':
+    if storage_t == 'db':
         amenities = place.amenities
     else:
-        amenities = [storage.get(Amenity, amenity_id).to_dict()
+        amenities = [storage.get(Amenity, amenity_id)
                      for amenity_id in place.amenity_ids]
+        amenities = [amenity for amenity in amenities if amenity is not None]
 
     return jsonify([amenity.to_dict() for amenity in amenities])
 
@@ -43,12 +44,12 @@ def delete_place_amenity(place_id, amenity_id):
             amenity not in place.amenities:
         abort(404)
 
-    if storage_type == 'db':
+    if storage_t == 'db':
         place.amenities.remove(amenity)
     else:
         place.amenity_ids.remove(amenity_id)
 
-    storage.save()
+    place.save()
     return jsonify({}), 200
 
 
@@ -64,7 +65,7 @@ def link_place_amenity(place_id, amenity_id):
     if place is None or amenity is None:
         abort(404)
 
-    if storage_type == 'db':
+    if storage_t == 'db':
         if amenity in place.amenities:
             return jsonify(amenity.to_dict()), 200
         place.amenities.append(amenity)
@@ -73,5 +74,5 @@ def link_place_amenity(place_id, amenity_id):
             return jsonify(amenity.to_dict()), 200
         place.amenity_ids.append(amenity_id)
 
-    storage.save()
+    place.save()
     return jsonify(amenity.to_dict()), 201
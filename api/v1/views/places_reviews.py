@@ -2,8 +2,11 @@
 """Handles all default RESTful API tasks for reviews."""
 
 from flask import abort, jsonify, request
+from models.place import Place
 from models.review import Review
+from models.user import User
 from api.v1.views import app_views
+from api.v1.views.pagination import paginate, stream
 from models import storage
 
 
@@ -17,9 +20,11 @@ def get_place_reviews(place_id):
     # Return 404 error if the Place object is not found
     if place is None:
         abort(404)
-    # Otherwise, retrieve and return the list of Review objects in JSON format
-    reviews = [review.to_dict() for review in place.reviews]
-    return jsonify(reviews)
+    page = paginate(Review, {"place_id": place_id})
+    if page is not None:
+        return page
+    # Otherwise, stream the list of Review objects in JSON format
+    return stream(storage.each(Review, {"place_id": place_id}))
 
 
 # Retrieves a Review object: GET /api/v1/reviews/<review_id>
@@ -4,6 +4,7 @@ Handles all default RESTFul API
 """
 from flask import Flask, jsonify, abort, make_response, request
 from api.v1.views import app_views
+from api.v1.views.pagination import paginate, stream
 from models import storage
 from models.state import State
 
@@ -12,8 +13,10 @@ from models.state import State
                  strict_slashes=False)
 def get_states():
     """Retrieves the list of all State objects"""
-    states = storage.all(State).values()
-    return jsonify([state.to_dict() for state in states])
+    page = paginate(State)
+    if page is not None:
+        return page
+    return stream(storage.each(State))
 
 
 @app_views.route('/states/<state_id>', methods=['GET'],
@@ -73,5 +76,5 @@ def update_state(state_id):
         if key not in ['id', 'created_at', 'updated_at']:
             setattr(state, key, value)
 
-    storage.save()
+    state.save()
     return make_response(jsonify(state.to_dict()), 200)
@@ -3,6 +3,7 @@
 Users app view
 """
 from api.v1.views import app_views
+from api.v1.views.pagination import paginate, stream
 from flask import jsonify, abort, make_response, request
 from models import storage
 from models.user import User
@@ -12,8 +13,10 @@ from models.user import User
 @app_views.route("/users", methods=['GET'])
 def all_users():
     """Retrieves the list of all User objects"""
-    users_list = [user.to_dict() for user in storage.all("User").values()]
-    return jsonify(users_list)
+    page = paginate(User)
+    if page is not None:
+        return page
+    return stream(storage.each(User))
 
 
 # Route to retrieve a specific User object by user_id
@@ -75,5 +78,5 @@ def update_user(user_id):
         if key not in ignore_keys:
             setattr(user, key, value)
 
-    storage.save()
+    user.save()
     return make_response(jsonify(user.to_dict()), 200)
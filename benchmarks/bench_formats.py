@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+"""
+Benchmarks the file formats and compressions of FileStorage: size, save
+and reload time
+
+usage: python3 -m benchmarks.bench_formats [number_of_objects]
+"""
+
+from collections import deque
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from models.engine.file_storage import FileStorage
+from models.engine.serializers import compressions, file_mode, formats, \
+    stream
+from models.place import Place
+from models.review import Review
+
+
+def empty():
+    """drops every object held by the storage"""
+    for attr in ("objects", "class_objects", "indexes", "listed",
+                 "ordered", "entries", "serialized", "changed", "records"):
+        setattr(FileStorage, "_FileStorage__" + attr, {})
+
+
+def timed(function):
+    """returns the seconds function() takes"""
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tmp = tempfile.mkdtemp()
+    FileStorage._FileStorage__file_path = os.path.join(tmp, "file.json")
+    ids = [str(uuid.uuid4()) for i in range(max(n // 100, 1))]
+    empty()
+    storage = FileStorage()
+    for i in range(n):
+        fk = ids[i % len(ids)]
+        storage.new(Place(name="place", city_id=fk, user_id=fk)
+                    if i % 2 else Review(text="review", place_id=fk,
+                                         user_id=fk))
+    print("{} objects".format(n))
+    for compression, (module, ext, level) in compressions.items():
+        for name, fmt in formats.items():
+            FileStorage._FileStorage__format = name
+            FileStorage._FileStorage__compression = compression
+            # every dictionary cached, as for a save after a single change
+            storage.compact()
+            save = timed(storage.compact)
+            path = os.path.join(tmp, "file" + fmt.extension + ext)
+            size = os.path.getsize(path)
+            with open(path, "r" + file_mode(fmt, compression)) as f:
+                with stream(f, fmt, compression, "r") as s:
+                    read = timed(lambda: deque(fmt.iter_items(s), maxlen=0))
+            empty()
+            reload = timed(storage.reload)
+            assert storage.count() == n
+            print("{:<14}{:>8.1f} MB{:>8.2f} s save{:>8.2f} s read"
+                  "{:>8.2f} s reload".format(name + ext, size / 2 ** 20,
+                                             save, read, reload))
+    FileStorage._FileStorage__format = "json"
+    FileStorage._FileStorage__compression = "none"
+    shutil.rmtree(tmp)
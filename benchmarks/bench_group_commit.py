@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+"""
+Benchmarks concurrent saves with and without a commit window
+
+usage: python3 -m benchmarks.bench_group_commit [number_of_objects]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import models
+from models.engine.file_storage import FileStorage
+from models.review import Review
+
+
+def burst(threads, saves):
+    """runs saves saves in each of threads threads, returns the seconds"""
+    def work():
+        """saves new reviews"""
+        for _ in range(saves):
+            Review(text="review").save()
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    tmp = tempfile.mkdtemp()
+    FileStorage._FileStorage__file_path = os.path.join(tmp, "file.json")
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__class_objects = {}
+    storage = models.storage
+    for _ in range(n):
+        storage.new(Review(text="review"))
+    storage.save()
+    print("{} objects, 20 threads x 10 saves".format(storage.count()))
+    for window in (0, 5):
+        FileStorage._FileStorage__commit_window = window / 1000
+        seconds = burst(20, 10)
+        print("commit window {:>2} ms {:>14.1f} saves/s".format(
+            window, 200 / seconds))
+    FileStorage._FileStorage__commit_window = 0
+    os.remove(FileStorage._FileStorage__file_path)
+    os.rmdir(tmp)
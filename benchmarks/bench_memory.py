@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+"""
+Benchmarks the memory held per model instance built from stored records
+
+usage: python3 -m benchmarks.bench_memory [count]
+"""
+
+import sys
+import tracemalloc
+from models.place import Place
+from models.review import Review
+from models.state import State
+
+
+def report(cls, count, **kwargs):
+    """prints the bytes allocated per instance of cls built from records"""
+    records = []
+    for i in range(count):
+        record = cls().to_dict()
+        record.update(kwargs)
+        records.append(record)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [cls(**record) for record in records]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("{:<10}{:>8.0f} B/object".format(
+        cls.__name__, (after - before) / len(objs)))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    report(State, count, name="California")
+    report(Place, count, city_id="city", user_id="user", name="Loft",
+           number_rooms=2, price_by_night=90)
+    report(Review, count, place_id="place", user_id="user", text="Nice")
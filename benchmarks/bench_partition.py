@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+"""
+Benchmarks class scoped FileStorage lookups against a full scan
+
+usage: python3 -m benchmarks.bench_partition [number_of_objects]
+"""
+
+import sys
+import timeit
+from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+mix = [(Review, 50), (Place, 25), (User, 15), (Amenity, 5), (City, 4),
+       (State, 1)]
+
+
+def populate(n):
+    """adds n objects to storage following the mix ratios"""
+    for cls, share in mix:
+        for _ in range(n * share // 100):
+            storage.new(cls())
+
+
+def scan(cls):
+    """the former all(cls): walk every object and compare its class"""
+    return {key: value for key, value in storage.all().items()
+            if cls == value.__class__ or cls == value.__class__.__name__}
+
+
+def report(label, stmt, number):
+    """prints the mean time of stmt in microseconds"""
+    seconds = timeit.timeit(stmt, number=number) / number
+    print("{:<28}{:>14.1f} us".format(label, seconds * 1e6))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    populate(n)
+    state_id = next(iter(storage.all(State).values())).id
+    print("{} objects, {} states".format(storage.count(),
+                                         storage.count(State)))
+    report("scan all(State)", lambda: scan(State), 3)
+    report("all(State)", lambda: storage.all(State), 100)
+    report("scan get(State, id)",
+           lambda: scan(State).get("State." + state_id), 3)
+    report("get(State, id)", lambda: storage.get(State, state_id), 100)
+    report("scan count(State)", lambda: len(scan(State)), 3)
+    report("count(State)", lambda: storage.count(State), 100)
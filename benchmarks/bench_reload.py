@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+"""
+Benchmarks FileStorage.reload time and peak memory
+
+usage: python3 -m benchmarks.bench_reload [number_of_objects]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from models.engine.file_storage import FileStorage, classes
+from models.place import Place
+from models.review import Review
+
+
+def empty():
+    """drops every object held by the storage"""
+    for attr in ("objects", "class_objects", "indexes", "listed",
+                 "ordered", "entries", "serialized", "changed", "records"):
+        setattr(FileStorage, "_FileStorage__" + attr, {})
+
+
+def json_load(path):
+    """the former reload: parse the whole file, then build the objects"""
+    storage = FileStorage()
+    with open(path, "r") as f:
+        jo = json.load(f)
+    for key in jo:
+        storage._FileStorage__add(classes[jo[key]["__class__"]](**jo[key]))
+        FileStorage._FileStorage__serialized[key] = jo[key]
+
+
+def measure(label, function, *args):
+    """prints the time and the peak traced memory of function(*args)"""
+    empty()
+    start = time.perf_counter()
+    function(*args)
+    seconds = time.perf_counter() - start
+    empty()
+    tracemalloc.start()
+    result = function(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("{:<16}{:>10.2f} s{:>10.1f} MB peak{:>10.1f} MB kept".format(
+        label, seconds, peak / 2 ** 20, current / 2 ** 20))
+    return result
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "file.json")
+    FileStorage._FileStorage__file_path = path
+    empty()
+    storage = FileStorage()
+    # foreign keys drawn from a few ids, as in a real store
+    ids = [str(uuid.uuid4()) for i in range(max(n // 100, 1))]
+    for i in range(n):
+        fk = ids[i % len(ids)]
+        storage.new(Place(name="place", city_id=fk, user_id=fk)
+                    if i % 2 else Review(text="review", place_id=fk,
+                                         user_id=fk))
+    storage.save()
+    print("{} objects, {:.1f} MB file".format(
+        n, os.path.getsize(path) / 2 ** 20))
+    kept = measure("json.load", json_load, path)
+    del kept
+    measure("reload()", storage.reload)
+    FileStorage._FileStorage__lazy = True
+    measure("lazy reload()", storage.reload)
+    FileStorage._FileStorage__lazy = False
+    # the objects of a class spread over files come back out of order
+    FileStorage._FileStorage__shards = 8
+    for obj in list(storage.all().values()):
+        storage.new(obj)
+    storage.save()
+    measure("sharded reload()", storage.reload)
+    empty()
+    shutil.rmtree(tmp)
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+"""
+Benchmarks FileStorage.save after a single object changed
+
+usage: python3 -m benchmarks.bench_save [number_of_objects]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+
+
+def report(label, stmt, number):
+    """prints the mean time of stmt in milliseconds"""
+    seconds = timeit.timeit(stmt, number=number) / number
+    print("{:<28}{:>14.2f} ms".format(label, seconds * 1e3))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tmp = tempfile.mkdtemp()
+    FileStorage._FileStorage__file_path = os.path.join(tmp, "file.json")
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__class_objects = {}
+    storage = FileStorage()
+    for i in range(n):
+        storage.new(Place(name="place", number_rooms=i) if i % 2
+                    else Review(text="review"))
+    storage.save()
+    place = next(iter(storage.all(Place).values()))
+    print("{} objects".format(storage.count()))
+
+    def cold():
+        """save with an empty serialization cache"""
+        FileStorage._FileStorage__serialized = {}
+        place.save()
+
+    report("save(), nothing cached", cold, 3)
+    report("save(), one object changed", place.save, 10)
+    for durability in ("file", "dir"):
+        FileStorage._FileStorage__durability = durability
+        report("save(), durability=" + durability, place.save, 10)
+    FileStorage._FileStorage__durability = "none"
+    for shards in (1, 16):
+        FileStorage._FileStorage__shards = shards
+        report("save(), {} shards per class".format(shards), place.save, 10)
+    FileStorage._FileStorage__shards = 0
+    FileStorage._FileStorage__journal = True
+    report("journal save(), one change", place.save, 100)
+    shutil.rmtree(tmp)
@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+"""
+Benchmarks the FileStorage lookups of places_search
+
+usage: python3 -m benchmarks.bench_search [number_of_places]
+"""
+
+import random
+import sys
+import timeit
+from models.amenity import Amenity
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.state import State
+
+order = ["created_at", "id"]
+
+
+def report(label, stmt, number):
+    """prints the mean time of stmt in milliseconds"""
+    seconds = timeit.timeit(stmt, number=number) / number
+    print("{:<36}{:>12.3f} ms".format(label, seconds * 1e3))
+
+
+def scan(storage, city_ids, amenity_ids):
+    """the former search: every place checked in Python, then sorted"""
+    places = [place for place in storage.all(Place).values()
+              if place.city_id in city_ids and
+              all(id in place.amenity_ids for id in amenity_ids)]
+    return sorted(places, key=lambda p: (p.created_at, p.id))[:20]
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    random.seed(0)
+    storage = FileStorage()
+    states = [State(name=str(i)) for i in range(50)]
+    cities = [City(name=str(i), state_id=states[i % 50].id)
+              for i in range(max(n // 100, 50))]
+    # a common amenity, and rarer ones
+    amenities = [Amenity(name=str(i)) for i in range(10)]
+    for obj in states + cities + amenities:
+        storage.new(obj)
+    for i in range(n):
+        place = Place(name=str(i), city_id=random.choice(cities).id)
+        place.amenity_ids = [a.id for j, a in enumerate(amenities)
+                             if random.random() < 0.5 / (j + 1)]
+        storage.new(place)
+    print("{} places".format(storage.count(Place)))
+    city_ids = [city.id for city in storage.query(
+        City, where={"state_id": states[0].id})]
+    wifi, rare = amenities[0].id, amenities[-1].id
+
+    report("page of all places", lambda: storage.query(
+        Place, order_by=order, limit=20), 100)
+    report("page of a common amenity", lambda: storage.query(
+        Place, where={"amenity_ids": wifi}, order_by=order, limit=20), 100)
+    report("page of a rare amenity", lambda: storage.query(
+        Place, where={"amenity_ids": rare}, order_by=order, limit=20), 100)
+    report("page of a state, two amenities", lambda: storage.query(
+        Place, where={"city_id": city_ids, "amenity_ids": [wifi, rare]},
+        order_by=order, limit=20), 100)
+    report("state, two amenities, Python scan", lambda: scan(
+        storage, set(city_ids), [wifi, rare]), 3)
@@ -0,0 +1,26 @@
+#!/usr/bin/python3
+"""
+Benchmarks the timestamp codec of BaseModel against strptime/strftime
+
+usage: python3 -m benchmarks.bench_timestamps
+"""
+
+from datetime import datetime
+import timeit
+from models.base_model import format_time, parse_time, time
+
+
+def report(label, stmt, number=200000):
+    """prints the mean time of stmt in nanoseconds"""
+    seconds = timeit.timeit(stmt, number=number) / number
+    print("{:<28}{:>10.0f} ns".format(label, seconds * 1e9))
+
+
+if __name__ == "__main__":
+    now = datetime.utcnow()
+    text = now.strftime(time)
+    assert format_time(now) == text and parse_time(text) == now
+    report("datetime.strptime", lambda: datetime.strptime(text, time))
+    report("parse_time", lambda: parse_time(text))
+    report("datetime.strftime", lambda: now.strftime(time))
+    report("format_time", lambda: format_time(now))
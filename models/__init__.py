@@ -1,17 +1,43 @@
 #!/usr/bin/python3
 """
 initialize the models package
+
+models.storage is created and reloaded on first access, so that the
+modules that do not use it (the file converter of
+models.engine.serializers) neither read the files nor connect
 """
 
 from os import getenv
+import threading
 
 
 storage_t = getenv("HBNB_TYPE_STORAGE")
 
-if storage_t == "db":
-    from models.engine.db_storage import DBStorage
-    storage = DBStorage()
+# SQLite storage maps the models to tables exactly as MySQL storage does
+if storage_t == "sqlite":
+    storage_t = "db"
+    from models.engine.sqlite_storage import SQLiteStorage as Storage
+elif storage_t == "db":
+    from models.engine.db_storage import DBStorage as Storage
 else:
-    from models.engine.file_storage import FileStorage
-    storage = FileStorage()
-storage.reload()
+    from models.engine.file_storage import FileStorage as Storage
+# Lock - held while the storage is created
+storage_lock = threading.Lock()
+
+
+def __getattr__(name):
+    """creates and reloads the storage on the first access to it"""
+    global storage
+    if name != "storage":
+        raise AttributeError("module {!r} has no attribute {!r}"
+                             .format(__name__, name))
+    with storage_lock:
+        if "storage" in globals():
+            return storage
+        storage = Storage()
+        try:
+            storage.reload()
+        except Exception:
+            del storage
+            raise
+        return storage
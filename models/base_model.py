@@ -13,39 +13,120 @@ import uuid
 
 time = "%Y-%m-%dT%H:%M:%S.%f"
 
+
+def parse_time(value):
+    """
+    returns the datetime of a string in the time format, using the C
+    ISO 8601 parser and falling back on strptime for other strings;
+    raises ValueError on a UTC offset, as strptime does: the times are
+    naive UTC and an aware one does not compare with them
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, time)
+    if parsed.tzinfo is not None:
+        raise ValueError("time data {!r} has a UTC offset".format(value))
+    return parsed
+
+
+def format_time(value):
+    """returns the string of a datetime in the time format"""
+    return value.isoformat(timespec="microseconds")
+
+
 if models.storage_t == "db":
     Base = declarative_base()
 else:
     Base = object
 
 
+class IndexedAttribute:
+    """
+    File storage model attribute whose value the storage indexes, such
+    as a foreign key: it reads as its default until an instance sets
+    it, and BaseModel.__setattr__ calls storage.reindex() when it changes
+    """
+
+    def __init__(self, default=""):
+        """Initialization of the attribute with its class level default"""
+        self.default = default
+
+    def __get__(self, obj, objtype=None):
+        """Returns the default of an instance that did not set it"""
+        if obj is None:
+            return self
+        return self.default
+
+
+class ListAttribute:
+    """
+    File storage model attribute holding a list: each instance gets its
+    own empty list on first access rather than sharing a class level one
+    """
+
+    def __set_name__(self, owner, name):
+        """Records the name the attribute is bound to"""
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        """Returns a new empty list stored on the instance"""
+        if obj is None:
+            return self
+        value = []
+        object.__setattr__(obj, self.name, value)
+        return value
+
+
 class BaseModel:
     """The BaseModel class from which future classes will be derived"""
     if models.storage_t == "db":
         id = Column(String(60), primary_key=True)
-        created_at = Column(DateTime, default=datetime.utcnow)
+        created_at = Column(DateTime, default=datetime.utcnow, index=True)
         updated_at = Column(DateTime, default=datetime.utcnow)
 
     def __init__(self, *args, **kwargs):
         """Initialization of the base model"""
+        # attributes are set through object.__setattr__, an object being
+        # built is not in storage yet, and always starting with id and
+        # the timestamps lets the instances of a class share the table
+        # of their attribute names (PEP 412 key-sharing dictionaries)
         if kwargs:
-            for key, value in kwargs.items():
-                if key != "__class__":
-                    setattr(self, key, value)
-            if kwargs.get("created_at", None) and type(self.created_at) is str:
-                self.created_at = datetime.strptime(kwargs["created_at"], time)
+            id = kwargs.get("id", None)
+            created_at = kwargs.get("created_at", None)
+            updated_at = kwargs.get("updated_at", None)
+            if id is None:
+                id = str(uuid.uuid4())
+            if created_at and type(created_at) is str:
+                created_at = parse_time(created_at)
             else:
-                self.created_at = datetime.utcnow()
-            if kwargs.get("updated_at", None) and type(self.updated_at) is str:
-                self.updated_at = datetime.strptime(kwargs["updated_at"], time)
+                created_at = datetime.utcnow()
+            if updated_at and type(updated_at) is str:
+                updated_at = parse_time(updated_at)
             else:
-                self.updated_at = datetime.utcnow()
-            if kwargs.get("id", None) is None:
-                self.id = str(uuid.uuid4())
+                updated_at = datetime.utcnow()
+            object.__setattr__(self, "id", id)
+            object.__setattr__(self, "created_at", created_at)
+            object.__setattr__(self, "updated_at", updated_at)
+            for key, value in kwargs.items():
+                if key not in ("__class__", "id", "created_at",
+                               "updated_at"):
+                    object.__setattr__(self, key, value)
         else:
-            self.id = str(uuid.uuid4())
-            self.created_at = datetime.utcnow()
-            self.updated_at = self.created_at
+            object.__setattr__(self, "id", str(uuid.uuid4()))
+            object.__setattr__(self, "created_at", datetime.utcnow())
+            object.__setattr__(self, "updated_at", self.created_at)
+
+    if models.storage_t != "db":
+        def __setattr__(self, name, value):
+            """Sets an attribute, telling the storage if it is indexed"""
+            if isinstance(getattr(type(self), name, None), IndexedAttribute):
+                old = getattr(self, name)
+                object.__setattr__(self, name, value)
+                if old != value:
+                    models.storage.reindex(self, name, old)
+            else:
+                object.__setattr__(self, name, value)
 
     def __str__(self):
         """String representation of the BaseModel class"""
@@ -58,13 +139,13 @@ class BaseModel:
         models.storage.new(self)
         models.storage.save()
 
-    def to_dict(self):
+    def to_dict(self, include_password=False):
         """returns a dictionary containing all keys/values of the instance"""
         new_dict = self.__dict__.copy()
         if "created_at" in new_dict:
-            new_dict["created_at"] = new_dict["created_at"].strftime(time)
+            new_dict["created_at"] = format_time(new_dict["created_at"])
         if "updated_at" in new_dict:
-            new_dict["updated_at"] = new_dict["updated_at"].strftime(time)
+            new_dict["updated_at"] = format_time(new_dict["updated_at"])
         new_dict["__class__"] = self.__class__.__name__
         if "_sa_instance_state" in new_dict:
             del new_dict["_sa_instance_state"]
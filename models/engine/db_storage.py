@@ -7,14 +7,16 @@ import models
 from models.amenity import Amenity
 from models.base_model import BaseModel, Base
 from models.city import City
+from models.engine.query import order_terms, values_of
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
 from os import getenv
 import sqlalchemy
-from sqlalchemy import create_engine
+from sqlalchemy import and_, create_engine, func, or_, select
 from sqlalchemy.orm import scoped_session, sessionmaker
+from types import MappingProxyType
 
 classes = {"Amenity": Amenity, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
@@ -24,19 +26,25 @@ class DBStorage:
     """interaacts with the MySQL database"""
     __engine = None
     __session = None
+    __factory = None
 
-    def __init__(self):
-        """Instantiate a DBStorage object"""
-        HBNB_MYSQL_USER = getenv('HBNB_MYSQL_USER')
-        HBNB_MYSQL_PWD = getenv('HBNB_MYSQL_PWD')
-        HBNB_MYSQL_HOST = getenv('HBNB_MYSQL_HOST')
-        HBNB_MYSQL_DB = getenv('HBNB_MYSQL_DB')
+    def __init__(self, engine=None):
+        """
+        Instantiate a DBStorage object on engine, by default the MySQL
+        database given by the HBNB_MYSQL_* environment variables
+        """
         HBNB_ENV = getenv('HBNB_ENV')
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.
-                                      format(HBNB_MYSQL_USER,
-                                             HBNB_MYSQL_PWD,
-                                             HBNB_MYSQL_HOST,
-                                             HBNB_MYSQL_DB))
+        if engine is None:
+            HBNB_MYSQL_USER = getenv('HBNB_MYSQL_USER')
+            HBNB_MYSQL_PWD = getenv('HBNB_MYSQL_PWD')
+            HBNB_MYSQL_HOST = getenv('HBNB_MYSQL_HOST')
+            HBNB_MYSQL_DB = getenv('HBNB_MYSQL_DB')
+            engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.
+                                   format(HBNB_MYSQL_USER,
+                                          HBNB_MYSQL_PWD,
+                                          HBNB_MYSQL_HOST,
+                                          HBNB_MYSQL_DB))
+        self.__engine = engine
         if HBNB_ENV == "test":
             Base.metadata.drop_all(self.__engine)
 
@@ -51,6 +59,87 @@ class DBStorage:
                     new_dict[key] = obj
         return (new_dict)
 
+    def snapshot(self, cls=None):
+        """
+        returns a read only dictionary of the objects, of class cls if
+        given, as queried when it is taken
+        """
+        return MappingProxyType(self.all(cls))
+
+    def query(self, cls, where=None, order_by=None, limit=None, offset=0,
+              after=None):
+        """
+        returns the list of the objects of cls whose columns equal the
+        values of the dictionary where, or one of them for a list,
+        sorted by order_by (see order_terms), skipping the first offset
+        and keeping at most limit of them; with after, the values of the
+        order_by columns of a row, only the rows that come after it are
+        kept (keyset pagination).
+        A relationship in where matches the rows related to every one of
+        the ids given. It is all done by a single SELECT.
+        """
+        query = self.__select(cls, where, order_by, after)
+        if query is None:
+            return []
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def each(self, cls, where=None, batch=1000):
+        """
+        iterates over the objects of cls matching where (see query),
+        fetched from the database batch rows at a time through a session
+        of its own: a streamed response reads them after close() removed
+        the session of the request. The session is closed once the
+        objects are read or the iteration is dropped
+        """
+        session = self.__factory()
+        try:
+            query = self.__select(cls, where, session=session)
+            if query is not None:
+                yield from query.yield_per(batch)
+        finally:
+            session.close()
+
+    def __select(self, cls, where=None, order_by=None, after=None,
+                 session=None):
+        """
+        returns the Query of query(), on session if given, None for an
+        unknown class
+        """
+        if type(cls) == str:
+            cls = classes.get(cls)
+        if cls is None:
+            return None
+        query = (session or self.__session).query(cls)
+        for attr, value in (where or {}).items():
+            values = values_of(value)
+            column = getattr(cls, attr)
+            if hasattr(column.property, "mapper"):
+                # one EXISTS on the association table per id
+                for value in values:
+                    query = query.filter(column.any(id=value))
+            elif len(values) == 1:
+                query = query.filter(column == values[0])
+            else:
+                query = query.filter(column.in_(values))
+        terms = order_terms(order_by)
+        if after is not None:
+            # (a, b) after (x, y): a > x OR (a = x AND b > y)
+            keyset, equal = [], []
+            for (attr, descending), value in zip(terms, after):
+                column = getattr(cls, attr)
+                keyset.append(and_(*equal, column < value if descending
+                                   else column > value))
+                equal.append(column == value)
+            query = query.filter(or_(*keyset))
+        for attr, descending in terms:
+            column = getattr(cls, attr)
+            query = query.order_by(column.desc() if descending else column)
+        return query
+
     def new(self, obj):
         """add the object to the current database session"""
         self.__session.add(obj)
@@ -69,6 +158,7 @@ class DBStorage:
         Base.metadata.create_all(self.__engine)
         sess_factory = sessionmaker(bind=self.__engine, expire_on_commit=False)
         Session = scoped_session(sess_factory)
+        self.__factory = sess_factory
         self.__session = Session
 
     def close(self):
@@ -82,24 +172,43 @@ class DBStorage:
             cls: The class to get
             id: The id of the class to get
         '''
-        # Create the key
         if type(cls) == str:
-            key = cls + "." + id
-        else:
-            key = cls.__name__ + "." + id
-        # Get all the stored instances of the specified class
-        instances_dict = self.all(cls)
-        instance = instances_dict.get(key)
-
-        return instance
+            cls = classes.get(cls)
+        if cls is None or id is None:
+            return None
+        # Primary key lookup: served from the session identity map when
+        # the object is already loaded, otherwise a single-row SELECT
+        return self.__session.get(cls, id)
 
     def count(self, cls=None):
         '''
         Returns the number of objects in storage matching the given class.
+        The rows are counted by the database with SELECT COUNT(*).
+        '''
+        if cls is None:
+            return sum(self.count_many().values())
+        if type(cls) == str:
+            cls = classes.get(cls)
+        if cls is None:
+            return 0
+        return self.__session.query(func.count(cls.id)).scalar()
+
+    def count_many(self, clss=None):
+        '''
+        Returns a dictionary of <class name>: number of objects for each
+        class in clss (every class by default), using a single query
+        with one COUNT(*) subquery per class.
         '''
-        if cls:
-            instances_dict = self.all(cls)
-            return len(instances_dict)
-        else:
-            instances_dict = self.all()
-            return len(instances_dict)
+        if clss is None:
+            clss = classes.keys()
+        names = [c if type(c) == str else c.__name__ for c in clss]
+        known = [name for name in names if name in classes]
+        counts = dict.fromkeys(names, 0)
+        if known:
+            query = select(*[select(func.count())
+                             .select_from(classes[name])
+                             .scalar_subquery().label(name)
+                             for name in known])
+            row = self.__session.execute(query).one()
+            counts.update(zip(known, row))
+        return counts
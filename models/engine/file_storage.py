@@ -3,71 +3,1227 @@
 Contains the FileStorage class
 """
 
+from contextlib import contextmanager
+import atexit
+import bisect
+import heapq
 import json
 from models.amenity import Amenity
-from models.base_model import BaseModel
+from models.base_model import BaseModel, IndexedAttribute
 from models.city import City
+from models.engine.query import order_terms, values_of
+from models.engine.rwlock import ReadWriteLock
+from models.engine.serializers import compressions, file_mode, formats, \
+    stream
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
+from os import getenv
+import os
+import sys
+import threading
+from types import MappingProxyType
+import zlib
+try:
+    import fcntl
+except ImportError:
+    # no advisory file locks on this platform, the files must then be
+    # used by a single process
+    fcntl = None
 
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
 
+def class_name(cls):
+    """returns the class name of a class or of a class name string"""
+    if type(cls) == str:
+        return cls
+    return cls.__name__
+
+
+def indexed_attributes(cls):
+    """returns the names of the IndexedAttribute attributes of cls"""
+    names = []
+    for klass in cls.__mro__:
+        for name, value in vars(klass).items():
+            if isinstance(value, IndexedAttribute) and name not in names:
+                names.append(name)
+    return names
+
+
+# dictionary - <class name>: names of the attributes indexed by storage
+indexes = {name: indexed_attributes(cls) for name, cls in classes.items()}
+
+# dictionary - <class name>: names of the list attributes whose items
+# are indexed by storage, an object being listed under each of them
+list_indexes = {"Place": ["amenity_ids"]}
+
+# dictionary - <class name>: names of the attributes holding object ids
+# or lists of them, whose loaded values are interned
+references = {name: ["id"] + attrs + list_indexes.get(name, [])
+              for name, attrs in indexes.items()}
+
+# list - the order storage keeps the objects of each class sorted in,
+# the order of keyset pagination: (attribute, descending) pairs
+keyset_order = [("created_at", False), ("id", False)]
+
+
+def sort_key(terms):
+    """
+    returns the key function sorting objects by the attributes of the
+    (attribute, descending) pairs terms, missing values (None) first
+    """
+    def key(obj):
+        """returns the sort key of obj"""
+        values = []
+        for attr, descending in terms:
+            value = getattr(obj, attr, None)
+            values.append((value is not None, value))
+        return values
+    return key
+
+
+def comes_after(obj, terms, after):
+    """
+    returns True if obj comes strictly after the values after of the
+    attributes of terms in the order terms sort objects in
+    """
+    for (attr, descending), cursor in zip(terms, after):
+        value = getattr(obj, attr, None)
+        value, cursor = (value is not None, value), \
+            (cursor is not None, cursor)
+        if value != cursor:
+            return value < cursor if descending else value > cursor
+    return False
+
+
+def intern_record(record):
+    """
+    interns the class name and the ids of a record read from storage,
+    so that an id repeated in thousands of foreign keys is one string
+    """
+    name = record["__class__"] = sys.intern(record["__class__"])
+    for attr in references.get(name, ()):
+        value = record.get(attr)
+        if type(value) is str:
+            record[attr] = sys.intern(value)
+        elif type(value) is list:
+            record[attr] = [sys.intern(v) if type(v) is str else v
+                            for v in value]
+
+
+def build(record):
+    """
+    returns the object of a record read from storage, built without
+    the __init__ of its class: the record is stored as it was saved,
+    the password of a user already hashed
+    """
+    cls = classes[record["__class__"]]
+    obj = cls.__new__(cls)
+    BaseModel.__init__(obj, **record)
+    return obj
+
+
+# what a write waits for before returning: nothing, the file data on
+# disk, or the file data and the directory entry on disk
+durabilities = ("none", "file", "dir")
+
+
+def fsync_directory(path):
+    """flushes the directory entries of the directory holding path"""
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_open(path, mode="w", durability="none"):
+    """
+    opens a temporary file next to path for writing and, once the block
+    succeeded, renames it over path so readers only ever see the old or
+    the new complete file
+    """
+    if durability not in durabilities:
+        raise ValueError("unknown durability: {}".format(durability))
+    tmp = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+    try:
+        with open(tmp, mode) as f:
+            yield f
+            f.flush()
+            if durability != "none":
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    if durability == "dir":
+        fsync_directory(path)
+
+
+@contextmanager
+def locked(path, exclusive):
+    """
+    holds an advisory lock on the file at path, created if needed, and
+    yields its descriptor, or None when it cannot be created for a
+    shared lock (read only directory)
+    """
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError:
+        if exclusive:
+            raise
+        yield None
+        return
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield fd
+    finally:
+        # closing the descriptor releases the lock
+        os.close(fd)
+
+
 class FileStorage:
     """
     Serializes instances to a JSON
     file & deserializes back to instances
+
+    The dictionaries written for each object are cached and only
+    recomputed for objects passed to new() since they were serialized,
+    so changes made to an object must be followed by obj.save() or
+    storage.new(obj) to be written.
+
+    IndexedAttribute attributes (the foreign keys of the models) are
+    indexed by value, and so are the ids listed in Place.amenity_ids,
+    see all_by() and query(). The objects of each class are also kept
+    sorted by (created_at, id), so query() reads a keyset page of them
+    without sorting.
+
+    The JSON file is replaced atomically through a temporary file, and
+    HBNB_FILE_DURABILITY picks what a write waits for: none (default),
+    file (fsync of the file) or dir (fsync of the file and directory).
+
+    With HBNB_FILE_COMMIT_WINDOW=<milliseconds>, the saves made during
+    the window, or until HBNB_FILE_COMMIT_MAX saves are waiting, are
+    written together by a single flush().
+
+    With HBNB_FILE_LAZY=on, reload() keeps the records it reads and an
+    object is only built when get(), all() or all_by() reach it.
+
+    HBNB_FILE_FORMAT picks the format of the files: json (default) or
+    pickle, stored in file.pickle instead of file.json; python3 -m
+    models.engine.serializers converts a file from one to the other.
+    HBNB_FILE_COMPRESSION compresses the files as they are written and
+    decompresses them as they are read: none (default), gzip, bz2 or
+    lzma, adding .gz, .bz2 or .xz to their name, at the level given by
+    HBNB_FILE_COMPRESSION_LEVEL or a default level of the compression.
+
+    With HBNB_FILE_SHARDS=<n>, each class is stored in its own files
+    instead of the JSON file, its objects spread over n of them by a
+    hash of their id: <file>.<class>.json for n = 1, otherwise
+    <file>.<class>.<shard>.json. A write only replaces the files holding
+    changed objects, and reload() only reads the classes listed in
+    HBNB_FILE_CLASSES (comma separated, every class by default), the
+    others being read on first access.
+
+    With HBNB_FILE_JOURNAL=on, save() appends the objects changed since
+    the last save to <file>.journal instead of rewriting the JSON file,
+    and the journal is folded into the JSON file by compact() once it
+    holds HBNB_FILE_JOURNAL_MAX records.
+
+    FileStorage can be shared by threads: lookups hold a ReadWriteLock
+    for reading, changes to the objects hold it for writing, and saves
+    only hold it while they collect what to write. all() returns the
+    dictionary the storage keeps changing, all(cls) a copy, and
+    snapshot() a read only copy that is shared until the next change,
+    to iterate without holding up the threads changing the objects.
+
+    Processes share the files through <file>.lock: reload() holds an
+    advisory lock on it for reading and writes hold it exclusively. It
+    stores a generation number that each write increments, so a write
+    first reads the changes of the other processes, keeping the changes
+    of this one on top, and close() tells cheaply whether to reload:
+    files changed by hand are only noticed until the first generation.
+    When only the journal grew, close() replays its new records only.
     """
 
     # string - path to the JSON file
     __file_path = "file.json"
     # dictionary - empty but will store all objects by <class name>.id
     __objects = {}
+    # dictionary - the same objects partitioned by <class name>
+    __class_objects = {}
+    # dictionary - <class name>: {attribute: {value: {<class name>.id:
+    # object}}} of the attributes listed in indexes and of the items of
+    # those listed in list_indexes
+    __indexes = {}
+    # dictionary - <class name>.id: [(attribute, items)] of the items of
+    # the list attributes under which the object is indexed
+    __listed = {}
+    # dictionary - <class name>: sorted list of the (created_at, id) of
+    # its objects, the keyset_order
+    __ordered = {}
+    # dictionary - <class name>.id: (created_at, id) entry of the object
+    # in __ordered
+    __entries = {}
+    # set - names of the classes whose list in __ordered is rebuilt once
+    # the files being read are loaded, None when no file is being read
+    __unsorted = None
+    # dictionary - <class name>, None for every class: number of changes
+    # made to its objects
+    __versions = {}
+    # dictionary - <class name>, None for every class: (version, objects,
+    # read only copy) of the last snapshot() taken
+    __snapshots = {}
+    # dictionary - <class name>.id: object (None once deleted) of the
+    # objects passed to new() or delete() since the last save
+    __changed = {}
+    # string - key of formats, the format of the files
+    __format = getenv("HBNB_FILE_FORMAT", "json")
+    # string - key of compressions, the compression of the files
+    __compression = getenv("HBNB_FILE_COMPRESSION", "none")
+    # string - compression level, empty for the default of the compression
+    __compression_level = getenv("HBNB_FILE_COMPRESSION_LEVEL", "")
+    # dictionary - <class name>.id: to_dict() of the object as last
+    # serialized, dropped whenever the object is passed to new()
+    __serialized = {}
+    # boolean - append changes to the journal instead of rewriting
+    __journal = getenv("HBNB_FILE_JOURNAL") == "on"
+    # integer - number of journal records that triggers a compaction
+    __journal_max = int(getenv("HBNB_FILE_JOURNAL_MAX", "1000"))
+    # integer - number of records currently in the journal
+    __journal_records = 0
+    # integer - offset of the end of the last journal record applied
+    __journal_offset = 0
+    # integer - generation of the files last read or written
+    __generation = 0
+    # string - one of durabilities
+    __durability = getenv("HBNB_FILE_DURABILITY", "none")
+    # string - path of the file the last reload failed to read, whose
+    # objects are partly loaded: writes refuse to go over it
+    __unreadable = None
+    # tuple - signature of the JSON file and the journal when they were
+    # last read or written by this process
+    __loaded = None
+    # float - seconds during which saves are held back to be written
+    # together (HBNB_FILE_COMMIT_WINDOW, in milliseconds), 0 to write
+    # on every save
+    __commit_window = float(getenv("HBNB_FILE_COMMIT_WINDOW", "0")) / 1000
+    # integer - held back saves that trigger the write before the window
+    # is over
+    __commit_max = int(getenv("HBNB_FILE_COMMIT_MAX", "64"))
+    # Condition - guards the commit tickets and wakes up waiting saves
+    __commit = threading.Condition()
+    # RLock - held while changes are written to the files
+    __flush_lock = threading.RLock()
+    # ReadWriteLock - held to read the objects, indexes and records, or
+    # to change them
+    __lock = ReadWriteLock()
+    # integers - ticket of the last save made and of the last one written
+    __requested = 0
+    __committed = 0
+    # list - [first, last ticket, exception, waiting saves] of the failed
+    # writes, each kept until its waiting saves have raised the exception
+    __failed = []
+    # set - tickets of the saves waiting for their write
+    __waiting = set()
+    # Timer - write scheduled at the end of the current window
+    __timer = None
+    # boolean - keep the records read by reload() as dictionaries and
+    # build their objects on first access
+    __lazy = getenv("HBNB_FILE_LAZY") == "on"
+    # dictionary - <class name>: {<class name>.id: record} of the
+    # records read in lazy mode whose object was not built yet
+    __records = {}
+    # integer - number of files each class is spread over, 0 to store
+    # every object in the JSON file
+    __shards = int(getenv("HBNB_FILE_SHARDS", "0"))
+    # list - names of the classes reload() reads in sharded mode, None
+    # for every class
+    __classes = [name for name in getenv("HBNB_FILE_CLASSES", "").split(",")
+                 if name in classes] or None
+    # set - names of the classes whose files were not read yet
+    __unread = set()
+    # set - (class name, shard) of the files missing changes made to
+    # their objects
+    __dirty = set()
 
     def all(self, cls=None):
         """returns the dictionary __objects"""
         if cls is not None:
-            new_dict = {}
-            for key, value in self.__objects.items():
-                if cls == value.__class__ or cls == value.__class__.__name__:
-                    new_dict[key] = value
-            return new_dict
+            return dict(self.snapshot(cls))
+        for name in list(self.__unread):
+            self.__read(name)
+        for name in list(self.__records):
+            self.__materialize(name)
         return self.__objects
 
+    def snapshot(self, cls=None):
+        """
+        returns a read only copy of __objects, or of the objects of cls,
+        as they are when it is taken; the copy is made once per change
+        and shared by the readers meanwhile
+        """
+        if cls is None:
+            name = None
+            self.all()
+        else:
+            name = class_name(cls)
+            self.__materialize(name)
+        with self.__lock.read():
+            if name is None:
+                objects = self.__objects
+            else:
+                objects = self.__class_objects.get(name, {})
+            version = self.__versions.get(name, 0)
+            snapshot = self.__snapshots.get(name)
+            if snapshot is not None and snapshot[0] == version and \
+                    snapshot[1] is objects:
+                return snapshot[2]
+            copy = MappingProxyType(dict(objects))
+            # readers racing here store equal copies
+            self.__snapshots[name] = (version, objects, copy)
+        return copy
+
+    def __materialize(self, name, key=None):
+        """
+        builds the objects of the records of class name not built yet,
+        or only the one stored under key; returns the last object built
+        """
+        self.__read(name)
+        obj = None
+        if not self.__records.get(name):
+            return obj
+        with self.__lock.write():
+            records = self.__records.get(name, {})
+            if key is None:
+                with self.__sorting():
+                    for key in list(records):
+                        obj = self.__build(records.pop(key))
+            elif key in records:
+                obj = self.__build(records.pop(key))
+        return obj
+
+    def __build(self, record):
+        """adds the object of a record kept in lazy mode and returns it"""
+        obj = build(record)
+        key = self.__add(obj)
+        self.__serialized[key] = record
+        return obj
+
+    def __load(self, key, value):
+        """stores a record read from the JSON file or the journal"""
+        if key in self.__changed:
+            # changed by this process since its last save, which wins
+            return
+        intern_record(value)
+        if self.__lazy:
+            self.__remove(key)
+            self.__records.setdefault(value["__class__"], {})[key] = value
+        else:
+            self.__add(build(value))
+            self.__serialized[key] = value
+
     def new(self, obj):
         """
         Sets in __objects the obj
         with key <obj class name>.id
         """
         if obj is not None:
-            key = obj.__class__.__name__ + "." + obj.id
-            self.__objects[key] = obj
+            self.__read(obj.__class__.__name__)
+            with self.__lock.write():
+                key = self.__add(obj)
+                self.__records.get(obj.__class__.__name__, {}).pop(key, None)
+                self.__changed[key] = obj
+                self.__serialized.pop(key, None)
+
+    def __add(self, obj):
+        """
+        stores obj in __objects and its class partition; an object that
+        cannot be indexed raises before anything is changed
+        """
+        name = obj.__class__.__name__
+        key = name + "." + obj.id
+        entries = self.__index_entries(name, obj)
+        previous = self.__objects.get(key)
+        if previous is not None:
+            self.__unindex(key, previous)
+        if previous is not obj:
+            self.__changed_class(name)
+        self.__objects[key] = obj
+        self.__class_objects.setdefault(name, {})[key] = obj
+        self.__index(key, obj, entries)
+        return key
+
+    def __remove(self, key):
+        """removes the object stored under key, if any"""
+        obj = self.__objects.pop(key, None)
+        self.__serialized.pop(key, None)
+        if obj is not None:
+            name = obj.__class__.__name__
+            self.__changed_class(name)
+            self.__class_objects.get(name, {}).pop(key, None)
+            self.__unindex(key, obj)
+
+    def __changed_class(self, name):
+        """counts a change to the objects of class name for snapshot()"""
+        for version in (name, None):
+            self.__versions[version] = self.__versions.get(version, 0) + 1
 
-    def save(self):
+    def __index_entries(self, name, obj):
+        """
+        returns the (values, listed, entry) under which obj of class name
+        is indexed, raising TypeError if one cannot be: an unhashable
+        value, a list attribute that is no list, a time that does not
+        compare with the others
+        """
+        values = [(attr, getattr(obj, attr)) for attr in indexes.get(name, ())]
+        hash(tuple(value for attr, value in values))
+        # the items are remembered, the list may be changed in place
+        listed = [(attr, tuple(dict.fromkeys(obj.__dict__.get(attr, ()))))
+                  for attr in list_indexes.get(name, ())]
+        entry = (obj.created_at, obj.id)
+        ordered = self.__ordered.get(name)
+        if ordered:
+            # raises on a time that does not compare with the others
+            ordered[0] < entry
+        return values, listed, entry
+
+    def __index(self, key, obj, entries):
+        """adds obj to the indexes of its class under its entries"""
+        name = obj.__class__.__name__
+        values, listed, entry = entries
+        for attr, value in values:
+            self.__indexes.setdefault(name, {}).setdefault(
+                attr, {}).setdefault(value, {})[key] = obj
+        for attr, items in listed:
+            index = self.__indexes.setdefault(name, {}).setdefault(attr, {})
+            for item in items:
+                index.setdefault(item, {})[key] = obj
+        if listed:
+            self.__listed[key] = listed
+        self.__entries[key] = entry
+        if self.__unsorted is not None:
+            self.__unsorted.add(name)
+        else:
+            bisect.insort(self.__ordered.setdefault(name, []), entry)
+
+    def __unindex(self, key, obj, attr=None, value=None):
+        """
+        removes obj from the indexes of its class, or only from the
+        index of attr under value when attr is given
+        """
+        name = obj.__class__.__name__
+        class_indexes = self.__indexes.get(name, {})
+        for index_attr in indexes.get(name, ()):
+            if attr is not None and index_attr != attr:
+                continue
+            index = class_indexes.get(index_attr, {})
+            if attr is None:
+                value = getattr(obj, index_attr)
+            bucket = index.get(value)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del index[value]
+        if attr is not None:
+            return
+        for list_attr, items in self.__listed.pop(key, ()):
+            index = class_indexes.get(list_attr, {})
+            for item in items:
+                bucket = index.get(item, {})
+                bucket.pop(key, None)
+                if not bucket:
+                    index.pop(item, None)
+        entry = self.__entries.pop(key, None)
+        if entry is not None and (self.__unsorted is None or
+                                  name not in self.__unsorted):
+            ordered = self.__ordered.get(name, [])
+            i = bisect.bisect_left(ordered, entry)
+            if i < len(ordered) and ordered[i] == entry:
+                del ordered[i]
+
+    @contextmanager
+    def __sorting(self):
+        """
+        defers the sorting of __ordered while files are read: each class
+        loaded meanwhile gets its list sorted once at the end, rather than
+        one insertion per object; holding the write lock
+        """
+        if self.__unsorted is not None:
+            yield
+            return
+        FileStorage.__unsorted = set()
+        try:
+            yield
+        finally:
+            for name in self.__unsorted:
+                self.__ordered[name] = sorted(
+                    [self.__entries[key]
+                     for key in self.__class_objects.get(name, ())])
+            FileStorage.__unsorted = None
+
+    def reindex(self, obj, attr, old):
+        """
+        moves obj in the index of attr after its value changed from old,
+        called by IndexedAttribute
+        """
+        key = obj.__class__.__name__ + "." + obj.__dict__.get("id", "")
+        with self.__lock.write():
+            if self.__objects.get(key) is not obj:
+                return
+            value = getattr(obj, attr)
+            # an unhashable value raises before obj leaves the index
+            hash(value)
+            self.__unindex(key, obj, attr, old)
+            self.__indexes.setdefault(obj.__class__.__name__, {}).setdefault(
+                attr, {}).setdefault(value, {})[key] = obj
+
+    def all_by(self, cls, attr, value):
+        """
+        returns the dictionary of the objects of cls
+        whose attribute attr equals value, or holds it for the list
+        attributes of list_indexes
+        """
+        name = class_name(cls)
+        self.__materialize(name)
+        with self.__lock.read():
+            if attr in indexes.get(name, ()) or \
+                    attr in list_indexes.get(name, ()):
+                index = self.__indexes.get(name, {}).get(attr, {})
+                return dict(index.get(value, {}))
+            return {key: obj
+                    for key, obj in self.__class_objects.get(name, {}).items()
+                    if getattr(obj, attr, None) == value}
+
+    def query(self, cls, where=None, order_by=None, limit=None, offset=0,
+              after=None):
+        """
+        returns the list of the objects of cls whose attributes equal
+        the values of the dictionary where, or one of them for a list,
+        sorted by order_by (see order_terms), skipping the first offset
+        and keeping at most limit of them; with after, the values of the
+        order_by attributes of an object, only the objects that come
+        after it are kept (keyset pagination)
+
+        The list attributes of list_indexes match when they hold every
+        one of the values instead. The candidates are the objects found
+        by id or in the smallest of the indexes of the attributes of
+        where, the other indexed attributes being checked against their
+        index. A page in keyset_order walks the sorted objects instead
+        when that reads fewer of them.
+        """
+        name = class_name(cls)
+        self.__materialize(name)
+        terms = order_terms(order_by)
+        with self.__lock.read():
+            candidates, found, conditions, sizes = self.__candidates(
+                name, where or {})
+            if terms == keyset_order and (candidates is None or
+                                          limit is not None and
+                                          self.__walk_cheaper(
+                                              name, sizes, offset + limit)):
+                return self.__walk(name, candidates, found, conditions,
+                                   limit, offset, after)
+            if candidates is not None:
+                keys = candidates.keys()
+                for other in found:
+                    keys = [key for key in keys if key in other]
+                candidates = [candidates[key] for key in keys]
+        if candidates is None:
+            candidates = self.snapshot(name).values()
+        objs = [obj for obj in candidates if
+                all(getattr(obj, attr, None) in values
+                    for attr, values in conditions) and
+                (after is None or comes_after(obj, terms, after))]
+        if terms and limit is not None and \
+                len({descending for attr, descending in terms}) == 1:
+            # only the first offset + limit objects are sorted
+            pick = heapq.nlargest if terms[0][1] else heapq.nsmallest
+            objs = pick(offset + limit, objs, key=sort_key(terms))
+        else:
+            # stable sorts, from the last attribute to the first
+            for term in reversed(terms):
+                objs.sort(key=sort_key([term]), reverse=term[1])
+        end = None if limit is None else offset + limit
+        return objs[offset:end]
+
+    def __candidates(self, name, where):
+        """
+        returns, for the conditions where of query(), the dictionary of
+        the objects of class name found through the smallest lookup
+        (None without lookup), the dictionaries the keys of the objects
+        must be in for some of the other lookups, the (attribute, values)
+        conditions left to check on the objects, and the number of
+        objects of each lookup, smallest first; holding the lock
+        """
+        # (number of objects, dictionaries of objects, condition)
+        lookups, conditions = [], []
+        class_indexes = self.__indexes.get(name, {})
+        for attr, value in where.items():
+            if attr == "id":
+                keys = dict.fromkeys(name + "." + str(id)
+                                     for id in values_of(value))
+                found = {key: self.__objects[key] for key in keys
+                         if key in self.__objects}
+                lookups.append((len(found), [found], None))
+            elif attr in indexes.get(name, ()):
+                values = dict.fromkeys(values_of(value))
+                index = class_indexes.get(attr, {})
+                buckets = [index.get(value, {}) for value in values]
+                lookups.append((sum(len(bucket) for bucket in buckets),
+                                buckets, (attr, values)))
+            elif attr in list_indexes.get(name, ()):
+                index = class_indexes.get(attr, {})
+                for value in dict.fromkeys(values_of(value)):
+                    bucket = index.get(value, {})
+                    lookups.append((len(bucket), [bucket], None))
+            else:
+                conditions.append((attr, values_of(value)))
+        if not lookups:
+            return None, [], conditions, []
+        lookups.sort(key=lambda lookup: lookup[0])
+        buckets = lookups[0][1]
+        if len(buckets) == 1:
+            candidates = buckets[0]
+        else:
+            candidates = {key: obj for bucket in buckets
+                          for key, obj in bucket.items()}
+        found = []
+        for size, buckets, condition in lookups[1:]:
+            # the values of an attribute are checked rather than the
+            # union of their buckets built
+            if len(buckets) == 1:
+                found.append(buckets[0])
+            else:
+                conditions.append(condition)
+        return candidates, found, conditions, [lookup[0]
+                                               for lookup in lookups]
+
+    def __walk_cheaper(self, name, sizes, needed):
+        """
+        returns True if walking the sorted objects of class name until
+        needed of them match the lookups of sizes objects each reads
+        fewer objects than the smallest lookup; holding the lock
+        """
+        total = len(self.__ordered.get(name, ()))
+        # expected matches, taking the lookups as independent
+        matches = float(total)
+        for size in sizes:
+            matches *= size / total if total else 0
+        return matches > 0 and needed * total < matches * sizes[0]
+
+    def __walk(self, name, candidates, found, conditions, limit, offset,
+               after):
+        """
+        returns the query() page in keyset_order of the objects of class
+        name, read from their sorted list; holding the lock
+        """
+        ordered = self.__ordered.get(name, [])
+        start = 0 if after is None else bisect.bisect_right(ordered,
+                                                            tuple(after))
+        objs = []
+        for i in range(start, len(ordered)):
+            if limit is not None and len(objs) == limit:
+                break
+            key = name + "." + ordered[i][1]
+            if candidates is not None and key not in candidates or \
+                    not all(key in keys for keys in found):
+                continue
+            obj = self.__objects.get(key)
+            if obj is None or not all(getattr(obj, attr, None) in values
+                                      for attr, values in conditions):
+                continue
+            if offset:
+                offset -= 1
+                continue
+            objs.append(obj)
+        return objs
+
+    def each(self, cls, where=None):
+        """
+        iterates over the objects of cls matching where (see query), as
+        they were when the iteration started
+        """
+        if where:
+            return iter(self.query(cls, where))
+        return iter(self.snapshot(cls).values())
+
+    def __to_dict(self, key, obj):
+        """returns the cached dictionary of obj, serializing it if needed"""
+        value = self.__serialized.get(key)
+        if value is None:
+            value = obj.to_dict(include_password=True)
+            self.__serialized[key] = value
+        return value
+
+    def __journal_path(self):
+        """returns the path of the journal file"""
+        return self.__file_path + ".journal"
+
+    def __lock_path(self):
+        """returns the path of the lock file"""
+        return self.__file_path + ".lock"
+
+    def __disk_generation(self, fd=None):
+        """
+        returns the generation stored in the lock file, read from its
+        descriptor fd if given, 0 if there is none
+        """
+        try:
+            if fd is None:
+                with open(self.__lock_path(), 'rb') as f:
+                    data = f.read(32)
+            else:
+                data = os.pread(fd, 32, 0)
+            return int(data or b"0")
+        except (OSError, ValueError):
+            return 0
+
+    def __next_generation(self, fd, generation):
+        """stores the generation following generation in the lock file"""
+        # fixed width, the number is overwritten in place
+        os.pwrite(fd, b"%020d" % (generation + 1), 0)
+        FileStorage.__generation = generation + 1
+        FileStorage.__loaded = self.__signature()
+
+    def __catch_up(self, fd):
+        """
+        reads the changes the other processes wrote since this one last
+        read or wrote the files, holding the lock file exclusively on fd;
+        returns the generation of the files
+        """
+        generation = self.__disk_generation(fd)
+        if generation != self.__generation:
+            self.__refresh(generation)
+        return generation
+
+    def __shard(self, key):
+        """returns the (class name, shard) of the file storing key"""
+        name, id = key.split(".", 1)
+        return name, zlib.crc32(id.encode()) % self.__shards
+
+    def __file_format(self):
+        """returns the format of the files"""
+        if self.__format not in formats:
+            raise ValueError("unknown format: {}".format(self.__format))
+        return formats[self.__format]
+
+    def __file_extension(self):
+        """returns the extension of the files of the format"""
+        if self.__compression not in compressions:
+            raise ValueError("unknown compression: {}".format(
+                self.__compression))
+        return self.__file_format().extension + \
+            compressions[self.__compression][1]
+
+    def __data_path(self):
+        """returns the path of the file, with the extension of its format"""
+        root = os.path.splitext(self.__file_path)[0]
+        return root + self.__file_extension()
+
+    def __shard_path(self, name, shard):
+        """returns the path of the file storing shard of class name"""
+        root = os.path.splitext(self.__file_path)[0]
+        ext = self.__file_extension()
+        if self.__shards == 1:
+            return "{}.{}{}".format(root, name, ext)
+        return "{}.{}.{}{}".format(root, name, shard, ext)
+
+    def __paths(self):
+        """returns the paths of the files storing the objects"""
+        if not self.__shards:
+            return [self.__data_path()]
+        return [self.__shard_path(name, shard) for name in classes
+                for shard in range(self.__shards)]
+
+    def __signature(self):
+        """
+        returns the (mtime, size, inode) of the JSON file, or of the
+        files of the classes, and of the journal, None for a missing file
+        """
+        signature = []
+        for path in self.__paths() + [self.__journal_path()]:
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def save(self, wait=True):
         """
         serializes __objects to
         the JSON file (path: __file_path)
+
+        With a commit window, the write is shared with the other saves
+        made during the window and wait tells whether to return only
+        once it is done
+        """
+        if not self.__commit_window:
+            with self.__flush_lock:
+                self.__write()
+            return
+        flush_now = False
+        with self.__commit:
+            FileStorage.__requested += 1
+            ticket = self.__requested
+            if wait:
+                self.__waiting.add(ticket)
+            if self.__requested - self.__committed >= self.__commit_max:
+                flush_now = True
+            elif self.__timer is None:
+                FileStorage.__timer = threading.Timer(self.__commit_window,
+                                                      self.__flush_window)
+                self.__timer.daemon = True
+                self.__timer.start()
+        if flush_now:
+            self.flush()
+        if wait:
+            with self.__commit:
+                self.__commit.wait_for(lambda: self.__committed >= ticket)
+                self.__waiting.discard(ticket)
+                for failed in self.__failed:
+                    if failed[0] < ticket <= failed[1]:
+                        failed[3] -= 1
+                        if not failed[3]:
+                            self.__failed.remove(failed)
+                        raise failed[2]
+
+    def flush(self):
         """
-        json_objects = {}
-        for key in self.__objects:
-            json_objects[key] = self.__objects[key].to_dict()
-        with open(self.__file_path, 'w') as f:
-            json.dump(json_objects, f)
+        writes the saves held back by the commit window
+        in a single write
+        """
+        with self.__flush_lock:
+            with self.__commit:
+                first = self.__committed
+                last = self.__requested
+                if self.__timer is not None:
+                    self.__timer.cancel()
+                    FileStorage.__timer = None
+            if last == first:
+                return
+            try:
+                self.__write()
+            except Exception as e:
+                with self.__commit:
+                    waiting = len([ticket for ticket in self.__waiting
+                                   if first < ticket <= last])
+                    if waiting:
+                        self.__failed.append([first, last, e, waiting])
+                raise
+            finally:
+                with self.__commit:
+                    FileStorage.__committed = last
+                    self.__commit.notify_all()
+
+    def __flush_window(self):
+        """
+        flush() run at the end of the commit window, its errors are
+        raised by the saves waiting for the write
+        """
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def __write(self):
+        """writes the changes to the journal or the JSON file"""
+        if not self.__journal:
+            self.compact()
+            return
+        with locked(self.__lock_path(), True) as fd:
+            generation = self.__catch_up(fd)
+            self.__check_readable()
+            changed = self.__append()
+            if not changed:
+                return
+            self.__mark_dirty(changed)
+            self.__next_generation(fd, generation)
+        if self.__journal_records >= self.__journal_max:
+            self.compact()
+
+    def __append(self):
+        """
+        appends the changes to the journal, after its last complete
+        record, and returns them; holding the lock file exclusively
+        """
+        path = self.__journal_path()
+        with self.__lock.read():
+            changed = self.__take_changed()
+            values = [(key, None if obj is None else self.__to_dict(key, obj))
+                      for key, obj in changed.items()]
+        if not changed:
+            return changed
+        created = not os.path.exists(path)
+        start = self.__journal_offset
+        try:
+            with open(path, 'ab') as f:
+                # a torn record left by an interrupted append would be
+                # glued to the first new one, both lost to replay
+                if f.tell() > start:
+                    f.truncate(start)
+                for key, value in values:
+                    f.write((json.dumps({"key": key, "value": value}) +
+                             "\n").encode())
+                f.flush()
+                if self.__durability != "none":
+                    os.fsync(f.fileno())
+                FileStorage.__journal_offset = f.tell()
+        except BaseException:
+            try:
+                os.truncate(path, start)
+            except OSError:
+                pass
+            # keep the changes for the next save
+            with self.__lock.write():
+                for key, obj in changed.items():
+                    self.__changed.setdefault(key, obj)
+            raise
+        if created and self.__durability == "dir":
+            fsync_directory(path)
+        FileStorage.__journal_records += len(changed)
+        return changed
+
+    def __take_changed(self):
+        """
+        returns the changed objects and starts a new set of changes,
+        dropping their cached dictionaries which may have been computed
+        while they were being modified; called by the writing thread,
+        the only one changing __changed while the lock is read
+        """
+        changed = self.__changed
+        FileStorage.__changed = {}
+        for key in changed:
+            self.__serialized.pop(key, None)
+        return changed
+
+    def __mark_dirty(self, keys):
+        """records the files of the objects stored under keys as dirty"""
+        if self.__shards:
+            self.__dirty.update(self.__shard(key) for key in keys)
+
+    def __check_readable(self):
+        """
+        raises an OSError if the last reload failed partway, so that the
+        objects it left out are not written over
+        """
+        if self.__unreadable is not None:
+            raise OSError("{} could not be read, not writing the objects"
+                          .format(self.__unreadable))
+
+    def compact(self):
+        """
+        writes every object to the JSON file, or the objects of the
+        dirty files of the classes, and empties the journal
+        """
+        with self.__flush_lock, locked(self.__lock_path(), True) as fd:
+            generation = self.__catch_up(fd)
+            self.__check_readable()
+            if self.__journal_records or \
+                    os.path.exists(self.__journal_path()):
+                # the journal outlives the files until they are replaced:
+                # it gets the changes too, so that replaying it over the
+                # new files, after a crash, changes nothing
+                self.__mark_dirty(self.__append())
+            # the objects are collected holding the lock, the files are
+            # written once it is released
+            with self.__lock.read():
+                self.__mark_dirty(self.__take_changed())
+                files = self.__files()
+            for shard, json_objects in files.items():
+                if shard is None:
+                    self.__dump(self.__data_path(), json_objects)
+                else:
+                    self.__dump(self.__shard_path(*shard), json_objects)
+                    self.__dirty.discard(shard)
+            if self.__journal_records or \
+                    os.path.exists(self.__journal_path()):
+                try:
+                    os.remove(self.__journal_path())
+                except FileNotFoundError:
+                    pass
+                if self.__durability == "dir":
+                    fsync_directory(self.__journal_path())
+                FileStorage.__journal_records = 0
+                FileStorage.__journal_offset = 0
+            self.__next_generation(fd, generation)
+
+    def __files(self):
+        """
+        returns {(class name, shard): dictionaries of its objects} for
+        the dirty files of the classes, or {None: dictionaries of every
+        object} for the JSON file
+        """
+        if not self.__shards:
+            json_objects = {}
+            for key, obj in self.__objects.items():
+                json_objects[key] = self.__to_dict(key, obj)
+            for records in self.__records.values():
+                json_objects.update(records)
+            return {None: json_objects}
+        dirty = {}
+        for name, shard in self.__dirty:
+            dirty.setdefault(name, set()).add(shard)
+        files = {}
+        for name, shards in dirty.items():
+            for shard, json_objects in self.__shard_objects(
+                    name, shards).items():
+                files[(name, shard)] = json_objects
+        return files
+
+    def __shard_objects(self, name, shards):
+        """
+        returns {shard: dictionaries of its objects} for each of the
+        shards of class name
+        """
+        json_objects = {shard: {} for shard in shards}
+        for key, obj in list(self.__class_objects.get(name, {}).items()):
+            objects = json_objects.get(self.__shard(key)[1])
+            if objects is not None:
+                objects[key] = self.__to_dict(key, obj)
+        for key, record in list(self.__records.get(name, {}).items()):
+            objects = json_objects.get(self.__shard(key)[1])
+            if objects is not None:
+                objects[key] = record
+        return json_objects
+
+    def __dump(self, path, json_objects):
+        """replaces the file at path with json_objects"""
+        fmt = self.__file_format()
+        mode = 'w' + file_mode(fmt, self.__compression)
+        level = None
+        if self.__compression_level:
+            level = int(self.__compression_level)
+        with atomic_open(path, mode, self.__durability) as f:
+            with stream(f, fmt, self.__compression, 'w', level) as s:
+                fmt.dump(json_objects, s)
 
     def reload(self):
         """
-        Deserializes the JSON file to __objects
+        Deserializes the JSON file to __objects, or the files of the
+        classes to load, then replays the journal on top of it; the
+        objects changed since the last save keep their changes
+        """
+        with locked(self.__lock_path(), False) as fd:
+            self.__refresh(self.__disk_generation(fd), False)
+
+    def __refresh(self, generation, replay=True):
+        """
+        reload() holding the lock file, that only replays the new records
+        of the journal if replay is set and only the journal grew since
+        the files were last read or written
         """
+        with self.__lock.write():
+            signature = self.__signature()
+            loaded = self.__loaded
+            journal = signature[-1]
+            if replay and loaded is not None and \
+                    signature[:-1] == loaded[:-1] and \
+                    (journal is None or
+                     (loaded[-1] is None or journal[2] == loaded[-1][2]) and
+                     journal[1] >= self.__journal_offset):
+                self.__replay(self.__journal_offset)
+            else:
+                changed = self.__changed
+                FileStorage.__unreadable = None
+                for objects in (self.__objects, self.__class_objects,
+                                self.__indexes, self.__listed,
+                                self.__ordered, self.__entries,
+                                self.__serialized, self.__records,
+                                self.__dirty, self.__snapshots):
+                    objects.clear()
+                with self.__sorting():
+                    if self.__shards:
+                        FileStorage.__unread = set(classes)
+                        for name in self.__classes or classes:
+                            self.__read(name)
+                    else:
+                        self.__read_file(self.__data_path())
+                    FileStorage.__journal_records = 0
+                    self.__replay()
+                    for key, obj in changed.items():
+                        if obj is not None:
+                            self.__add(obj)
+            FileStorage.__loaded = signature
+            FileStorage.__generation = generation
+
+    def __read(self, name):
+        """reads the files of class name, unless they were already read"""
+        if name not in self.__unread:
+            return
+        with self.__lock.write():
+            if name in self.__unread:
+                self.__unread.discard(name)
+                with self.__sorting():
+                    for shard in range(self.__shards):
+                        self.__read_file(self.__shard_path(name, shard))
+
+    def __read_file(self, path):
+        """loads the objects stored in the file at path"""
+        fmt = self.__file_format()
         try:
-            with open(self.__file_path, 'r') as f:
-                jo = json.load(f)
-            for key in jo:
-                self.__objects[key] = classes[jo[key]["__class__"]](**jo[key])
-        except:
+            # objects are built as the file is parsed: the file text and
+            # the whole parsed dictionary are never in memory at once
+            with open(path, 'r' + file_mode(fmt, self.__compression)) as f:
+                # an empty file, as a crash of a former non atomic write
+                # leaves, holds no objects to lose, like a missing one
+                if not os.fstat(f.fileno()).st_size:
+                    return
+                with stream(f, fmt, self.__compression, 'r') as s:
+                    for key, value in fmt.iter_items(s):
+                        self.__load(key, value)
+        except FileNotFoundError:
             pass
+        except Exception:
+            # the objects read so far are kept, but never written out
+            FileStorage.__unreadable = path
+            raise
+
+    def __replay(self, offset=0):
+        """
+        applies the records of the journal from offset to __objects,
+        up to its last complete record
+        """
+        records = 0
+        try:
+            with open(self.__journal_path(), 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # torn record from an interrupted append
+                        continue
+                    records += 1
+                    key, value = record["key"], record["value"]
+                    # the files of the class come first, and are written
+                    # again with the record on the next compaction
+                    self.__read(key.split(".", 1)[0])
+                    self.__mark_dirty([key])
+                    if key in self.__changed:
+                        continue
+                    if value is None:
+                        self.__remove(key)
+                        for pending in self.__records.values():
+                            pending.pop(key, None)
+                    else:
+                        self.__load(key, value)
+        except FileNotFoundError:
+            offset = 0
+        FileStorage.__journal_offset = offset
+        FileStorage.__journal_records += records
 
     def delete(self, obj=None):
         """
@@ -75,39 +1231,76 @@ class FileStorage:
         if it's inside.
         """
         if obj is not None:
+            self.__read(obj.__class__.__name__)
             key = obj.__class__.__name__ + '.' + obj.id
-            if key in self.__objects:
-                del self.__objects[key]
+            with self.__lock.write():
+                if key in self.__objects:
+                    self.__remove(key)
+                    self.__changed[key] = None
 
     def close(self):
         """
         call reload() method for deserializing
-        the JSON file to objects
+        the JSON file to objects, if another process wrote them since
+        this one last read or wrote them: the generation of the lock file
+        tells, or the files themselves while no process wrote one
         """
-        self.reload()
+        # a thread of this process writing the files is not a change,
+        # the next close() checks them again
+        if not self.__flush_lock.acquire(blocking=False):
+            return
+        try:
+            generation = self.__disk_generation()
+            if generation != self.__generation or \
+                    not generation and self.__signature() != self.__loaded:
+                with locked(self.__lock_path(), False) as fd:
+                    self.__refresh(self.__disk_generation(fd))
+        finally:
+            self.__flush_lock.release()
 
     def get(self, cls, id):
         '''
         Get an objects by class name and id
         '''
-        if type(cls) == str:
-            key = cls + "." + id
-        else:
-            key = cls.__name__ + "." + id
-
-        instances = self.all(cls)
-
-        instance = instances.get(key)
-
-        return instance
+        if cls is None or id is None:
+            return None
+        name = class_name(cls)
+        self.__read(name)
+        key = name + "." + id
+        with self.__lock.read():
+            obj = self.__objects.get(key)
+        if obj is None:
+            obj = self.__materialize(name, key)
+        return obj
 
     def count(self, cls=None):
         '''
         Count the number of the objects in storage
         '''
         if cls:
-            instances = self.all(cls)
-            return len(instances)
+            name = class_name(cls)
+            self.__read(name)
+            with self.__lock.read():
+                return len(self.__class_objects.get(name, {})) + \
+                    len(self.__records.get(name, {}))
         else:
-            instances = self.all()
-            return len(instances)
\ No newline at end of file
+            for name in list(self.__unread):
+                self.__read(name)
+            with self.__lock.read():
+                return len(self.__objects) + \
+                    sum(len(records) for records in self.__records.values())
+
+    def count_many(self, clss=None):
+        '''
+        Returns a dictionary of <class name>: number of objects for each
+        class in clss (every class by default)
+        '''
+        if clss is None:
+            clss = classes.keys()
+        return {class_name(cls): self.count(cls) for cls in clss}
+
+
+@atexit.register
+def flush_at_exit():
+    """writes the saves still held back by the commit window"""
+    FileStorage().flush()
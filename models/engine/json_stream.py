@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+"""
+Contains iter_items, an incremental reader of a JSON object file
+"""
+
+import json
+import sys
+
+whitespace = " \t\n\r"
+
+
+def interned_keys(pairs):
+    """
+    builds a dictionary with interned keys: json.load shares equal keys
+    within one document, which parsing value by value would not
+    """
+    return {sys.intern(key): value for key, value in pairs}
+
+
+decoder = json.JSONDecoder(object_pairs_hook=interned_keys)
+
+
+def iter_items(f, chunk_size=1 << 16):
+    """
+    yields the (key, value) pairs of the JSON object stored in the text
+    file f one at a time, reading chunk_size characters at once, so the
+    whole file is never held in memory
+    """
+    buf, pos, eof = "", 0, False
+    size = chunk_size
+    # what comes next: "{", a key or "}", a key, ":", a value, "," or "}"
+    state = "{"
+    key = None
+    while True:
+        while pos < len(buf) and buf[pos] in whitespace:
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError("unexpected end of JSON object")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        char = buf[pos]
+        if state == "{":
+            if char != "{":
+                raise ValueError("expected a JSON object")
+            pos += 1
+            state = "first"
+        elif state in (",", "first") and char == "}":
+            return
+        elif state == ",":
+            if char != ",":
+                raise ValueError("expected ',' or '}' at {}".format(pos))
+            pos += 1
+            state = "key"
+        elif state == ":":
+            if char != ":":
+                raise ValueError("expected ':' at {}".format(pos))
+            pos += 1
+            state = "value"
+        else:
+            try:
+                token, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                end = None
+            if end is None or end == len(buf) and not eof:
+                # the token may go on in the next chunk
+                chunk = f.read(size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                # grow the reads while a token spans many chunks
+                size *= 2
+                continue
+            pos = end
+            size = chunk_size
+            if state == "value":
+                yield key, token
+                state = ","
+            else:
+                if type(token) is not str:
+                    raise ValueError("expected a string key")
+                key = token
+                state = ":"
@@ -0,0 +1,27 @@
+#!/usr/bin/python3
+"""
+Contains the helpers the storage engines share to run query()
+"""
+
+
+def order_terms(order_by):
+    """
+    returns the (attribute, descending) pairs of order_by, an attribute
+    name or a list of them, each sorted descending if prefixed with "-"
+    """
+    if order_by is None:
+        return []
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    return [(attr[1:], True) if attr.startswith("-") else (attr, False)
+            for attr in order_by]
+
+
+def values_of(value):
+    """
+    returns the values a where value matches: the items of a list,
+    tuple or set, or the value itself
+    """
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return list(value)
+    return [value]
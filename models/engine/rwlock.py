@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Contains the ReadWriteLock class
+"""
+
+from contextlib import contextmanager
+import threading
+
+
+class ReadWriteLock:
+    """
+    Lock held either by any number of readers or by a single writer
+
+    Waiting writers keep new readers out so they are not starved. The
+    lock is reentrant: a reader may read again and the writer may read
+    or write again, but a reader cannot become the writer.
+    """
+
+    def __init__(self):
+        """Initialization of an unlocked lock"""
+        self.__cond = threading.Condition(threading.Lock())
+        # dictionary - thread ident: number of reads it holds
+        self.__readers = {}
+        # thread ident of the writer and number of writes it holds
+        self.__writer = None
+        self.__writes = 0
+        # integer - number of threads waiting to write
+        self.__waiting = 0
+
+    @contextmanager
+    def read(self):
+        """holds the lock for reading during the with block"""
+        me = threading.get_ident()
+        with self.__cond:
+            if self.__writer != me and me not in self.__readers:
+                self.__cond.wait_for(
+                    lambda: self.__writer is None and not self.__waiting)
+            self.__readers[me] = self.__readers.get(me, 0) + 1
+        try:
+            yield
+        finally:
+            with self.__cond:
+                self.__readers[me] -= 1
+                if not self.__readers[me]:
+                    del self.__readers[me]
+                    self.__cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        """holds the lock for writing during the with block"""
+        me = threading.get_ident()
+        with self.__cond:
+            if self.__writer != me:
+                if me in self.__readers:
+                    raise RuntimeError("cannot write while reading")
+                self.__waiting += 1
+                try:
+                    self.__cond.wait_for(
+                        lambda: self.__writer is None and not self.__readers)
+                finally:
+                    self.__waiting -= 1
+                self.__writer = me
+            self.__writes += 1
+        try:
+            yield
+        finally:
+            with self.__cond:
+                self.__writes -= 1
+                if not self.__writes:
+                    self.__writer = None
+                    self.__cond.notify_all()
@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+"""
+Contains the file formats and compressions FileStorage can store
+objects with
+
+usage: python3 -m models.engine.serializers <source> <destination>
+converts a storage file between formats and compressions, picked by
+file extension (file.json, file.pickle.gz, file.json.xz...)
+"""
+
+import bz2
+from contextlib import contextmanager
+import gzip
+import json
+import lzma
+from models.engine.json_stream import iter_items
+import os
+import pickle
+import sys
+
+
+class JSONFormat:
+    """JSON text, a single object of <class name>.id: dictionary"""
+    extension = ".json"
+    binary = False
+
+    @staticmethod
+    def dump(json_objects, f):
+        """writes the dictionaries json_objects to the text file f"""
+        # json.dumps runs the C encoder in one pass, json.dump the
+        # pure Python one chunk by chunk
+        f.write(json.dumps(json_objects))
+
+    @staticmethod
+    def iter_items(f):
+        """yields the (key, dictionary) pairs stored in the text file f"""
+        return iter_items(f)
+
+
+class RecordUnpickler(pickle.Unpickler):
+    """unpickler of plain data that refuses to import anything"""
+
+    def find_class(self, module, name):
+        """forbids the globals a crafted file could run"""
+        raise pickle.UnpicklingError(
+            "global {}.{} is forbidden".format(module, name))
+
+
+class PickleFormat:
+    """
+    Pickle protocol 5, lists of (<class name>.id, dictionary) pairs
+    pickled one after the other, so a file is read a batch at a time
+    """
+    extension = ".pickle"
+    binary = True
+    # integer - number of pairs pickled together
+    batch = 1000
+
+    @classmethod
+    def dump(cls, json_objects, f):
+        """writes the dictionaries json_objects to the binary file f"""
+        items = list(json_objects.items())
+        for i in range(0, len(items), cls.batch):
+            pickle.dump(items[i:i + cls.batch], f, protocol=5)
+
+    @staticmethod
+    def iter_items(f):
+        """yields the (key, dictionary) pairs stored in the binary file f"""
+        unpickler = RecordUnpickler(f)
+        while True:
+            try:
+                items = unpickler.load()
+            except EOFError:
+                return
+            # the strings repeated within a batch, such as the keys of
+            # the dictionaries, are unpickled once through the memo
+            yield from items
+
+
+# dictionary - HBNB_FILE_FORMAT value: format
+formats = {"json": JSONFormat, "pickle": PickleFormat}
+
+
+# dictionary - HBNB_FILE_COMPRESSION value: (module, file extension,
+# default level), levels trading a little size for much faster writes
+compressions = {"none": (None, "", None), "gzip": (gzip, ".gz", 6),
+                "bz2": (bz2, ".bz2", 9), "lzma": (lzma, ".xz", 1)}
+
+
+def file_mode(fmt, compression):
+    """returns "b" if the files of fmt under compression are binary"""
+    return "b" if fmt.binary or compression != "none" else ""
+
+
+@contextmanager
+def stream(f, fmt, compression, mode, level=None):
+    """
+    yields the file object fmt reads ('r' mode) or writes ('w' mode)
+    over the file f opened in mode + file_mode(), compressing at level
+    or decompressing on the fly, so the file is never held in memory
+    """
+    module, extension, default = compressions[compression]
+    if module is None:
+        yield f
+        return
+    options = {}
+    if mode == "w":
+        level = default if level is None else level
+        options = {"preset" if module is lzma else "compresslevel": level}
+    with module.open(f, mode + ("b" if fmt.binary else "t"),
+                     **options) as s:
+        yield s
+
+
+def format_of(path):
+    """returns the (format, compression) of the file at path"""
+    root, ext = os.path.splitext(path)
+    compression = "none"
+    for name, (module, extension, level) in compressions.items():
+        if module is not None and extension == ext:
+            compression = name
+            root, ext = os.path.splitext(root)
+    for fmt in formats.values():
+        if fmt.extension == ext:
+            return fmt, compression
+    raise ValueError("unknown storage file format: {}".format(path))
+
+
+def convert(source, destination):
+    """rewrites the storage file source to destination in its format"""
+    src, src_compression = format_of(source)
+    dst, dst_compression = format_of(destination)
+    with open(source, "r" + file_mode(src, src_compression)) as f:
+        with stream(f, src, src_compression, "r") as s:
+            json_objects = dict(src.iter_items(s))
+    with open(destination, "w" + file_mode(dst, dst_compression)) as f:
+        with stream(f, dst, dst_compression, "w") as s:
+            dst.dump(json_objects, s)
+    return len(json_objects)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python3 -m models.engine.serializers "
+              "<source> <destination>", file=sys.stderr)
+        sys.exit(1)
+    print("{} objects converted".format(convert(sys.argv[1], sys.argv[2])))
@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+"""
+Contains the class SQLiteStorage
+"""
+
+from models.engine.db_storage import DBStorage
+from os import getenv
+from sqlalchemy import create_engine, event
+
+
+def set_pragmas(dbapi_connection, connection_record):
+    """
+    configures every new SQLite connection: write-ahead logging lets
+    readers run alongside the writer, and with it a NORMAL synchronous
+    level only syncs at checkpoints while keeping commits atomic
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+class SQLiteStorage(DBStorage):
+    """interacts with an embedded SQLite database"""
+
+    def __init__(self, path=None):
+        """
+        Instantiate a SQLiteStorage object on the database file path,
+        by default HBNB_SQLITE_PATH or hbnb.db
+        """
+        if path is None:
+            path = getenv('HBNB_SQLITE_PATH', 'hbnb.db')
+        engine = create_engine('sqlite:///{}'.format(path))
+        event.listen(engine, "connect", set_pragmas)
+        super().__init__(engine)
@@ -1,7 +1,8 @@
 #!/usr/bin/python
 """ holds class Place"""
 import models
-from models.base_model import BaseModel, Base
+from models.base_model import BaseModel, Base, IndexedAttribute, \
+    ListAttribute
 from os import getenv
 import sqlalchemy
 from sqlalchemy import Column, String, Integer, Float, ForeignKey, Table
@@ -16,15 +17,17 @@ if models.storage_t == 'db':
                           Column('amenity_id', String(60),
                                  ForeignKey('amenities.id', onupdate='CASCADE',
                                             ondelete='CASCADE'),
-                                 primary_key=True))
+                                 primary_key=True, index=True))
 
 
 class Place(BaseModel, Base):
     """Representation of Place """
     if models.storage_t == 'db':
         __tablename__ = 'places'
-        city_id = Column(String(60), ForeignKey('cities.id'), nullable=False)
-        user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
+        city_id = Column(String(60), ForeignKey('cities.id'),
+                         nullable=False, index=True)
+        user_id = Column(String(60), ForeignKey('users.id'),
+                         nullable=False, index=True)
         name = Column(String(128), nullable=False)
         description = Column(String(1024), nullable=True)
         number_rooms = Column(Integer, nullable=False, default=0)
@@ -38,8 +41,8 @@ class Place(BaseModel, Base):
                                  backref="place_amenities",
                                  viewonly=False)
     else:
-        city_id = ""
-        user_id = ""
+        city_id = IndexedAttribute()
+        user_id = IndexedAttribute()
         name = ""
         description = ""
         number_rooms = 0
@@ -48,7 +51,7 @@ class Place(BaseModel, Base):
         price_by_night = 0
         latitude = 0.0
         longitude = 0.0
-        amenity_ids = []
+        amenity_ids = ListAttribute()
 
     def __init__(self, *args, **kwargs):
         """initializes Place"""
@@ -59,20 +62,16 @@ class Place(BaseModel, Base):
         def reviews(self):
             """getter attribute returns the list of Review instances"""
             from models.review import Review
-            review_list = []
-            all_reviews = models.storage.all(Review)
-            for review in all_reviews.values():
-                if review.place_id == self.id:
-                    review_list.append(review)
-            return review_list
+            return list(models.storage.all_by(Review, "place_id",
+                                              self.id).values())
 
         @property
         def amenities(self):
             """getter attribute returns the list of Amenity instances"""
             from models.amenity import Amenity
             amenity_list = []
-            all_amenities = models.storage.all(Amenity)
-            for amenity in all_amenities.values():
-                if amenity.place_id == self.id:
+            for amenity_id in self.amenity_ids:
+                amenity = models.storage.get(Amenity, amenity_id)
+                if amenity is not None:
                     amenity_list.append(amenity)
             return amenity_list
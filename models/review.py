@@ -1,7 +1,7 @@
 #!/usr/bin/python
 """ holds class Review"""
 import models
-from models.base_model import BaseModel, Base
+from models.base_model import BaseModel, Base, IndexedAttribute
 from os import getenv
 import sqlalchemy
 from sqlalchemy import Column, String, ForeignKey
@@ -11,12 +11,14 @@ class Review(BaseModel, Base):
     """Representation of Review """
     if models.storage_t == 'db':
         __tablename__ = 'reviews'
-        place_id = Column(String(60), ForeignKey('places.id'), nullable=False)
-        user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
+        place_id = Column(String(60), ForeignKey('places.id'),
+                          nullable=False, index=True)
+        user_id = Column(String(60), ForeignKey('users.id'),
+                         nullable=False, index=True)
         text = Column(String(1024), nullable=False)
     else:
-        place_id = ""
-        user_id = ""
+        place_id = IndexedAttribute()
+        user_id = IndexedAttribute()
         text = ""
 
     def __init__(self, *args, **kwargs):
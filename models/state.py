@@ -26,9 +26,5 @@ class State(BaseModel, Base):
         @property
         def cities(self):
             """ Getter for list of city instances related to the state"""
-            city_list = []
-            all_cities = models.storage.all(City)
-            for city in all_cities.values():
-                if city.state_id == self.id:
-                    city_list.append(city)
-            return city_list
+            return list(models.storage.all_by(City, "state_id",
+                                              self.id).values())
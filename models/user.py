@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 """ holds class User"""
+import hashlib
 import models
 from models.base_model import BaseModel, Base
 from os import getenv
@@ -29,8 +30,18 @@ class User(BaseModel, Base):
         if kwargs:
             pass_word = kwargs.pop('password', None)
             if pass_word:
-                secure = hashlib.md5()
-                secure.update(pass_word.encode("utf-8"))
-                secure_password = secure.hexdigest()
-                kwargs['password'] = secure_password
+                kwargs['password'] = hash_password(pass_word)
         super().__init__(*args, **kwargs)
+
+    def __setattr__(self, name, value):
+        """sets an attribute, hashing a new password"""
+        if name == 'password' and value:
+            value = hash_password(value)
+        super().__setattr__(name, value)
+
+
+def hash_password(password):
+    """returns the MD5 hex digest of password"""
+    secure = hashlib.md5()
+    secure.update(password.encode("utf-8"))
+    return secure.hexdigest()
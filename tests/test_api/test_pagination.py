@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+"""
+Contains the TestPagination, TestStreaming and TestDBStreaming classes
+"""
+
+from api.v1.app import app
+import base64
+from api.v1.views import pagination
+import models
+from models.city import City
+from models.state import State
+import json
+import pep8
+from tests.test_models.test_engine.test_file_storage import \
+    TmpFileStorageTestCase
+import unittest
+from unittest import mock
+
+
+class TestPaginationDocs(unittest.TestCase):
+    """Tests to check the documentation and style of pagination"""
+    def test_pep8_conformance(self):
+        """Test that pagination.py and its tests conform to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['api/v1/views/pagination.py',
+                                    'tests/test_api/test_pagination.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_module_docstring(self):
+        """Test for the pagination.py module docstring"""
+        self.assertTrue(pagination.__doc__)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestPagination(TmpFileStorageTestCase):
+    """Test the keyset pagination of the collection endpoints"""
+    def setUp(self):
+        """Store states, the first one with cities"""
+        super().setUp()
+        self.states = [State(name=str(i)) for i in range(25)]
+        self.cities = [City(name=str(i), state_id=self.states[i % 2].id)
+                       for i in range(30)]
+        for obj in self.states + self.cities:
+            self.storage.new(obj)
+        self.storage.save()
+
+    def get(self, url):
+        """Gets url from the API, returns (status code, JSON body)"""
+        with app.test_client() as client:
+            response = client.get("/api/v1" + url)
+            return response.status_code, response.get_json()
+
+    def walk(self, url, limit):
+        """Returns the ids of the pages of url and the page sizes"""
+        ids, sizes = [], []
+        status, page = self.get("{}?limit={}".format(url, limit))
+        while True:
+            self.assertEqual(status, 200)
+            ids += [obj["id"] for obj in page["results"]]
+            sizes.append(len(page["results"]))
+            if page["next"] is None:
+                return ids, sizes
+            status, page = self.get("{}?limit={}&after={}".format(
+                url, limit, page["next"]))
+
+    def test_pages(self):
+        """Test that the pages list every object once, in keyset order"""
+        ids, sizes = self.walk("/states", 10)
+        self.assertEqual(sizes, [10, 10, 5])
+        expected = sorted(self.states, key=lambda s: (s.created_at, s.id))
+        self.assertEqual(ids, [state.id for state in expected])
+
+    def test_nested_pages(self):
+        """Test that the pages of a nested collection keep to its parent"""
+        ids, sizes = self.walk(
+            "/states/{}/cities".format(self.states[0].id), 4)
+        self.assertEqual(sizes, [4, 4, 4, 3])
+        self.assertEqual(set(ids), {city.id for city in self.cities[::2]})
+
+    def test_exact_last_page(self):
+        """Test that a full last page has no next cursor"""
+        ids, sizes = self.walk("/states", 25)
+        self.assertEqual(sizes, [25])
+
+    def test_default_limit(self):
+        """Test that after alone pages by the default page size"""
+        first = self.get("/states?limit=1")[1]
+        with mock.patch.object(pagination, "default_limit", 3):
+            status, page = self.get("/states?after=" + first["next"])
+        self.assertEqual(len(page["results"]), 3)
+
+    def test_no_page(self):
+        """Test that a request without page parameters gets a list"""
+        status, states = self.get("/states")
+        self.assertEqual(status, 200)
+        self.assertEqual(len(states), 25)
+
+    def test_invalid(self):
+        """Test that invalid limits and cursors are rejected"""
+        for query in ["limit=0", "limit=x", "limit=100000", "after=x",
+                      "after=WzFd", "limit=2&after="]:
+            self.assertEqual(self.get("/states?" + query)[0], 400, query)
+        for keyset in [["2017-03-25T02:17:06.000000+00:00", "x"],
+                       ["2017-03-25T02:17:06.000000", 1],
+                       ["2017-03-25T02:17:06.000000", None]]:
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(keyset).encode()).decode()
+            self.assertEqual(self.get("/states?after=" + cursor)[0], 400,
+                             keyset)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestStreaming(TmpFileStorageTestCase):
+    """Test the streamed responses of the collection endpoints"""
+    def setUp(self):
+        """Store a state with cities"""
+        super().setUp()
+        self.state = State(name="California")
+        self.storage.new(self.state)
+        self.cities = [City(name=str(i), state_id=self.state.id)
+                       for i in range(50)]
+        for city in self.cities:
+            self.storage.new(city)
+        self.storage.save()
+        self.url = "/api/v1/states/{}/cities".format(self.state.id)
+
+    def get(self, url, accept=None):
+        """Gets url from the API, returns the response"""
+        headers = {} if accept is None else {"Accept": accept}
+        with app.test_client() as client:
+            return client.get(url, headers=headers)
+
+    def test_json(self):
+        """Test that a collection is streamed as a JSON list"""
+        with mock.patch.object(pagination, "chunk_size", 100):
+            response = self.get(self.url)
+            self.assertTrue(response.is_streamed)
+            chunks = list(response.response)
+        self.assertGreater(len(chunks), 10)
+        self.assertEqual(response.mimetype, "application/json")
+        cities = json.loads(b"".join(chunks))
+        self.assertEqual({city["id"] for city in cities},
+                         {city.id for city in self.cities})
+
+    def test_empty(self):
+        """Test that an empty collection is streamed as an empty list"""
+        response = self.get("/api/v1/amenities")
+        self.assertEqual(response.get_json(), [])
+
+    def test_ndjson(self):
+        """Test that a collection is streamed as NDJSON if accepted"""
+        response = self.get(self.url, "application/x-ndjson")
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual({json.loads(line)["id"] for line in lines},
+                         {city.id for city in self.cities})
+        response = self.get(self.url,
+                            "application/json, application/x-ndjson;q=0.5")
+        self.assertEqual(response.mimetype, "application/json")
+
+    def test_consistent(self):
+        """Test that a stream lists the objects as they were when it began"""
+        response = self.get(self.url)
+        for city in self.cities[:10]:
+            self.storage.delete(city)
+        self.storage.new(City(name="new", state_id=self.state.id))
+        self.assertEqual(len(response.get_json()), 50)
+
+
+@unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+class TestDBStreaming(unittest.TestCase):
+    """Test the streamed responses of the collection endpoints in db mode"""
+    def setUp(self):
+        """Store a state with cities"""
+        self.storage = models.storage
+        self.state = State(name="California")
+        self.storage.new(self.state)
+        self.storage.save()
+        self.cities = [City(name=str(i), state_id=self.state.id)
+                       for i in range(50)]
+        for city in self.cities:
+            self.storage.new(city)
+        self.storage.save()
+        self.url = "/api/v1/states/{}/cities".format(self.state.id)
+
+    def tearDown(self):
+        """Delete the state and its cities"""
+        for city in self.cities:
+            self.storage.delete(city)
+        self.storage.delete(self.state)
+        self.storage.save()
+
+    def test_stream_session(self):
+        """Test that a stream read after the teardown gives back its rows"""
+        pool = self.storage._DBStorage__engine.pool
+        checked_out = pool.checkedout()
+        with app.test_client() as client:
+            response = client.get(self.url,
+                                  headers={"Accept": "application/x-ndjson"})
+            lines = response.get_data(as_text=True).splitlines()
+            response.close()
+        self.assertEqual({json.loads(line)["id"] for line in lines},
+                         {city.id for city in self.cities})
+        self.assertLessEqual(pool.checkedout(), checked_out)
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+"""
+Contains the TestPlacesSearch class
+"""
+
+from api.v1.app import app
+import models
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.state import State
+import pep8
+from tests.test_models.test_engine.test_file_storage import \
+    TmpFileStorageTestCase
+import unittest
+
+
+class TestPlacesSearchDocs(unittest.TestCase):
+    """Tests to check the style of the places_search tests"""
+    def test_pep8_conformance(self):
+        """Test that tests/test_api/test_places_search.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['api/v1/views/places.py',
+                                    'tests/test_api/test_places_search.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestPlacesSearch(TmpFileStorageTestCase):
+    """Test POST /api/v1/places_search on a file storage"""
+    def setUp(self):
+        """Store two states of two cities of three places each"""
+        super().setUp()
+        self.wifi, self.pool = Amenity(name="Wifi"), Amenity(name="Pool")
+        self.states = [State(name=str(i)) for i in range(2)]
+        self.cities = [City(name=str(i), state_id=self.states[i // 2].id)
+                       for i in range(4)]
+        self.places = []
+        for i in range(12):
+            place = Place(name=str(i), city_id=self.cities[i // 3].id)
+            place.amenity_ids = [self.wifi.id] if i % 2 else []
+            if i % 3 == 0:
+                place.amenity_ids.append(self.pool.id)
+            self.places.append(place)
+        for obj in [self.wifi, self.pool] + self.states + self.cities + \
+                self.places:
+            self.storage.new(obj)
+        self.storage.save()
+
+    def search(self, body, query=""):
+        """Posts body to places_search, returns (status, JSON body)"""
+        with app.test_client() as client:
+            response = client.post("/api/v1/places_search" + query,
+                                   json=body)
+            return response.status_code, response.get_json()
+
+    def names(self, body):
+        """Returns the set of the names of the places found for body"""
+        status, places = self.search(body)
+        self.assertEqual(status, 200)
+        return {place["name"] for place in places}
+
+    def test_all(self):
+        """Test that no ids finds every place"""
+        everything = {str(i) for i in range(12)}
+        self.assertEqual(self.names({}), everything)
+        self.assertEqual(self.names({"states": [], "cities": []}),
+                         everything)
+
+    def test_states_cities(self):
+        """Test that the places of the states and cities are found"""
+        self.assertEqual(self.names({"states": [self.states[0].id]}),
+                         {str(i) for i in range(6)})
+        self.assertEqual(self.names({"states": [self.states[0].id],
+                                     "cities": [self.cities[1].id,
+                                                self.cities[3].id]}),
+                         {str(i) for i in list(range(6)) + [9, 10, 11]})
+        self.assertEqual(self.names({"cities": ["missing"]}), set())
+
+    def test_amenities(self):
+        """Test that only the places having every amenity are found"""
+        self.assertEqual(self.names({"amenities": [self.wifi.id]}),
+                         {"1", "3", "5", "7", "9", "11"})
+        self.assertEqual(self.names({"amenities": [self.wifi.id,
+                                                   self.pool.id]}),
+                         {"3", "9"})
+        self.assertEqual(self.names({"states": [self.states[1].id],
+                                     "amenities": [self.pool.id]}),
+                         {"6", "9"})
+
+    def test_pages(self):
+        """Test that the places found are paged"""
+        status, page = self.search({"amenities": [self.wifi.id]},
+                                   "?limit=4")
+        self.assertEqual((status, len(page["results"])), (200, 4))
+        status, rest = self.search({"amenities": [self.wifi.id]},
+                                   "?limit=4&after=" + page["next"])
+        self.assertEqual(len(rest["results"]), 2)
+        self.assertIsNone(rest["next"])
+
+    def test_bad_requests(self):
+        """Test that bodies other than lists of ids are rejected"""
+        for body in [[], "x", {"states": "x"}, {"cities": [1]}]:
+            self.assertEqual(self.search(body)[0], 400, body)
+        with app.test_client() as client:
+            response = client.post("/api/v1/places_search", data="x")
+            self.assertEqual(response.status_code, 400)
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+"""
+Contains the TestAPIStress class
+"""
+
+from api.v1.app import app
+from concurrent.futures import ThreadPoolExecutor
+import models
+from models.city import City
+from models.state import State
+import pep8
+from tests.test_models.test_engine.test_file_storage import \
+    TmpFileStorageTestCase
+import unittest
+
+
+class TestAPIStressDocs(unittest.TestCase):
+    """Tests to check the style of the API stress test"""
+    def test_pep8_conformance(self):
+        """Test that tests/test_api/test_stress.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_api/test_stress.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestAPIStress(TmpFileStorageTestCase):
+    """Runs hundreds of concurrent API calls on a file storage"""
+    threads = 16
+    states = 20
+    cities = 10
+
+    def call(self, method, url, json=None):
+        """Calls the API, returns (status code, JSON body)"""
+        with app.test_client() as client:
+            response = client.open("/api/v1" + url, method=method, json=json)
+            return response.status_code, response.get_json()
+
+    def test_concurrent_calls(self):
+        """Test that concurrent calls all succeed and are all saved"""
+        pool = ThreadPoolExecutor(self.threads)
+
+        def create_state(i):
+            """Creates a state with its cities, reading as it goes"""
+            status, state = self.call("POST", "/states", {"name": str(i)})
+            self.assertEqual(status, 201)
+            for j in range(self.cities):
+                status, city = self.call(
+                    "POST", "/states/{}/cities".format(state["id"]),
+                    {"name": str(j)})
+                self.assertEqual(status, 201)
+                self.assertEqual(self.call("GET", "/stats")[0], 200)
+                status, cities = self.call(
+                    "GET", "/states/{}/cities".format(state["id"]))
+                self.assertEqual(status, 200)
+                self.assertIn(city["id"], [c["id"] for c in cities])
+            return state, cities
+
+        def update_state(state, cities):
+            """Renames a state, deletes half of its cities"""
+            status, body = self.call(
+                "PUT", "/states/{}".format(state["id"]), {"name": "new"})
+            self.assertEqual((status, body["name"]), (200, "new"))
+            for city in cities[::2]:
+                self.assertEqual(self.call(
+                    "DELETE", "/cities/{}".format(city["id"]))[0], 200)
+                self.assertEqual(self.call(
+                    "GET", "/cities/{}".format(city["id"]))[0], 404)
+            self.assertEqual(self.call("GET", "/states")[0], 200)
+
+        with pool:
+            created = list(pool.map(create_state, range(self.states)))
+            list(pool.map(lambda args: update_state(*args), created))
+        left = self.states * (self.cities - self.cities // 2)
+        status, stats = self.call("GET", "/stats")
+        self.assertEqual((stats["states"], stats["cities"]),
+                         (self.states, left))
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(self.storage.count(City), left)
+        self.assertEqual([state.name for state in
+                          self.storage.all(State).values()],
+                         ["new"] * self.states)
@@ -158,3 +158,75 @@ class TestBaseModel(unittest.TestCase):
         self.assertEqual(old_created_at, new_created_at)
         self.assertTrue(mock_storage.new.called)
         self.assertTrue(mock_storage.save.called)
+
+
+class TestTimestamps(unittest.TestCase):
+    """Test the timestamp codec of the base_model module"""
+    t_format = "%Y-%m-%dT%H:%M:%S.%f"
+
+    def test_format_time(self):
+        """Test that format_time matches strftime, even without micros"""
+        for value in [datetime(2017, 6, 14, 22, 31, 3, 285259),
+                      datetime(2017, 6, 14, 22, 31, 3),
+                      datetime(1, 1, 1)]:
+            with self.subTest(value=value):
+                self.assertEqual(models.base_model.format_time(value),
+                                 value.strftime(self.t_format).zfill(26))
+
+    def test_parse_time(self):
+        """Test that parse_time reverses format_time"""
+        value = datetime(2017, 6, 14, 22, 31, 3, 285259)
+        text = value.strftime(self.t_format)
+        self.assertEqual(models.base_model.parse_time(text), value)
+
+    def test_parse_time_invalid(self):
+        """Test that parse_time raises ValueError on invalid strings"""
+        with self.assertRaises(ValueError):
+            models.base_model.parse_time("2017-06-14 not a time")
+        for text in ["2017-06-14T22:31:03.285259+00:00",
+                     "2017-06-14T22:31:03Z"]:
+            with self.assertRaises(ValueError):
+                models.base_model.parse_time(text)
+        with self.assertRaises(ValueError):
+            BaseModel(created_at="2017-06-14T22:31:03+02:00")
+
+    def test_kwargs_timestamps(self):
+        """Test that timestamps read from a dictionary are datetimes"""
+        inst = BaseModel()
+        copy = BaseModel(**inst.to_dict())
+        self.assertEqual(copy.created_at, inst.created_at)
+        self.assertEqual(copy.updated_at, inst.updated_at)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestCompactInstances(unittest.TestCase):
+    """Test that file storage instances of a class share their key table"""
+
+    def test_key_order(self):
+        """Test that instances start with id and timestamps in order"""
+        inst = BaseModel(name="a", updated_at=None, id="1")
+        self.assertEqual(list(inst.__dict__)[:3],
+                         ["id", "created_at", "updated_at"])
+        self.assertEqual(inst.id, "1")
+        self.assertEqual(inst.name, "a")
+        self.assertNotIn("__class__", inst.__dict__)
+
+    def test_indexed_attribute_default(self):
+        """Test that unset indexed attributes read as their default"""
+        from models.city import City
+        city = City()
+        self.assertEqual(city.state_id, "")
+        self.assertNotIn("state_id", city.__dict__)
+
+    @mock.patch('models.storage')
+    def test_indexed_attribute_reindex(self, mock_storage):
+        """Test that changing an indexed attribute reindexes the object"""
+        from models.city import City
+        city = City(state_id="a")
+        self.assertFalse(mock_storage.reindex.called)
+        city.state_id = "a"
+        self.assertFalse(mock_storage.reindex.called)
+        city.state_id = "b"
+        mock_storage.reindex.assert_called_once_with(city, "state_id", "a")
+        city.name = "b"
+        self.assertEqual(mock_storage.reindex.call_count, 1)
@@ -3,7 +3,8 @@
 Contains the TestFileStorageDocs classes
 """
 
-from datetime import datetime
+from datetime import datetime, timezone
+import gzip
 import inspect
 import models
 from models.engine import file_storage
@@ -15,9 +16,16 @@ from models.review import Review
 from models.state import State
 from models.user import User
 import json
+import multiprocessing
 import os
 import pep8
+import shutil
+import sys
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
 FileStorage = file_storage.FileStorage
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
@@ -132,4 +140,1452 @@ class TestFileStorage(unittest.TestCase):
             storage.new(city)
             storage.save()
             updated_cities = len(storage.all(City))
-            self.assertEqual(total_cities + 1, updated_cities)
\ No newline at end of file
+            self.assertEqual(total_cities + 1, updated_cities)
+
+
+class TestFileStoragePartition(unittest.TestCase):
+    """Test the per-class partitioning of FileStorage"""
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_cls_only_returns_cls(self):
+        """Test that all(cls) only returns objects of that class"""
+        storage = FileStorage()
+        state = State()
+        city = City()
+        storage.new(state)
+        storage.new(city)
+        for cls in (State, "State"):
+            with self.subTest(cls=cls):
+                states = storage.all(cls)
+                self.assertIn("State." + state.id, states)
+                self.assertNotIn("City." + city.id, states)
+                for value in states.values():
+                    self.assertIs(type(value), State)
+        storage.delete(state)
+        storage.delete(city)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_cls_returns_copy(self):
+        """Test that mutating all(cls) does not change the storage"""
+        storage = FileStorage()
+        state = State()
+        storage.new(state)
+        storage.all(State).clear()
+        self.assertIs(storage.get(State, state.id), state)
+        storage.delete(state)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_count_cls(self):
+        """Test that count(cls) follows new and delete"""
+        storage = FileStorage()
+        total = storage.count()
+        amenities = storage.count(Amenity)
+        amenity = Amenity()
+        storage.new(amenity)
+        self.assertEqual(storage.count(Amenity), amenities + 1)
+        self.assertEqual(storage.count("Amenity"), amenities + 1)
+        self.assertEqual(storage.count(), total + 1)
+        storage.delete(amenity)
+        self.assertEqual(storage.count(Amenity), amenities)
+        self.assertEqual(storage.count(), total)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_get_deleted(self):
+        """Test that get returns None once an object is deleted"""
+        storage = FileStorage()
+        review = Review()
+        storage.new(review)
+        self.assertIs(storage.get(Review, review.id), review)
+        storage.delete(review)
+        self.assertIsNone(storage.get(Review, review.id))
+        self.assertIsNone(storage.get("Review", review.id))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_get_missing(self):
+        """Test that get returns None for unknown classes or ids"""
+        storage = FileStorage()
+        self.assertIsNone(storage.get(State, "no-such-id"))
+        self.assertIsNone(storage.get("NoSuchClass", "no-such-id"))
+        self.assertIsNone(storage.get(State, None))
+        self.assertIsNone(storage.get(None, "no-such-id"))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_count_many(self):
+        """Test that count_many matches count for every class"""
+        storage = FileStorage()
+        counts = storage.count_many()
+        self.assertEqual(set(counts), set(classes))
+        for name, cls in classes.items():
+            self.assertEqual(counts[name], storage.count(cls))
+        self.assertEqual(storage.count_many([State, "City"]),
+                         {"State": storage.count(State),
+                          "City": storage.count(City)})
+
+
+class TmpFileStorageTestCase(unittest.TestCase):
+    """Base class for tests running FileStorage on a temporary file"""
+    attrs = ["file_path", "objects", "class_objects", "changed",
+             "serialized", "journal", "journal_max", "journal_records",
+             "loaded", "indexes", "durability", "commit_window",
+             "commit_max", "requested", "committed", "failed", "waiting",
+             "timer",
+             "lazy", "records", "shards", "classes", "unread", "dirty",
+             "format", "compression", "compression_level", "generation",
+             "journal_offset", "listed", "ordered", "entries",
+             "unreadable", "unsorted"]
+
+    def setUp(self):
+        """Use a temporary file and an empty storage"""
+        # models.storage, which the models use, is created and reloaded
+        # on first access: it must be before the files are swapped
+        models.storage
+        self.saved = {attr: getattr(FileStorage, "_FileStorage__" + attr)
+                      for attr in self.attrs}
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "file.json")
+        FileStorage._FileStorage__file_path = self.path
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__class_objects = {}
+        FileStorage._FileStorage__changed = {}
+        FileStorage._FileStorage__serialized = {}
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__journal_max = 1000
+        FileStorage._FileStorage__journal_records = 0
+        FileStorage._FileStorage__loaded = None
+        FileStorage._FileStorage__indexes = {}
+        FileStorage._FileStorage__durability = "none"
+        FileStorage._FileStorage__commit_window = 0
+        FileStorage._FileStorage__commit_max = 64
+        FileStorage._FileStorage__requested = 0
+        FileStorage._FileStorage__committed = 0
+        FileStorage._FileStorage__failed = []
+        FileStorage._FileStorage__waiting = set()
+        FileStorage._FileStorage__timer = None
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__records = {}
+        FileStorage._FileStorage__shards = 0
+        FileStorage._FileStorage__classes = None
+        FileStorage._FileStorage__unread = set()
+        FileStorage._FileStorage__dirty = set()
+        FileStorage._FileStorage__format = "json"
+        FileStorage._FileStorage__compression = "none"
+        FileStorage._FileStorage__compression_level = ""
+        FileStorage._FileStorage__generation = 0
+        FileStorage._FileStorage__journal_offset = 0
+        FileStorage._FileStorage__listed = {}
+        FileStorage._FileStorage__ordered = {}
+        FileStorage._FileStorage__entries = {}
+        FileStorage._FileStorage__unreadable = None
+        FileStorage._FileStorage__unsorted = None
+        self.storage = FileStorage()
+
+    def tearDown(self):
+        """Restore the storage"""
+        for attr, value in self.saved.items():
+            setattr(FileStorage, "_FileStorage__" + attr, value)
+        shutil.rmtree(self.tmp)
+
+    def forget(self):
+        """Drop every object held in memory"""
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__class_objects = {}
+        FileStorage._FileStorage__serialized = {}
+        FileStorage._FileStorage__indexes = {}
+        FileStorage._FileStorage__records = {}
+        FileStorage._FileStorage__listed = {}
+        FileStorage._FileStorage__ordered = {}
+        FileStorage._FileStorage__entries = {}
+
+    def journal_lines(self):
+        """Returns the records in the journal"""
+        with open(self.path + ".journal", "r") as f:
+            return [json.loads(line) for line in f]
+
+
+class TestFileStorageJournal(TmpFileStorageTestCase):
+    """Test the journal mode of FileStorage"""
+    def setUp(self):
+        """Switch the temporary storage to journal mode"""
+        super().setUp()
+        FileStorage._FileStorage__journal = True
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_appends(self):
+        """Test that save appends only the changed objects"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        city = City(name="San Francisco", state_id=state.id)
+        self.storage.new(city)
+        self.storage.save()
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual([r["key"] for r in self.journal_lines()],
+                         ["State." + state.id, "City." + city.id])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_replays(self):
+        """Test that reload applies the snapshot and then the journal"""
+        state = State(name="California")
+        other = State(name="Nevada")
+        self.storage.new(state)
+        self.storage.new(other)
+        self.storage.compact()
+        state.name = "Arizona"
+        self.storage.new(state)
+        self.storage.delete(other)
+        self.storage.save()
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, state.id).name, "Arizona")
+        self.assertIsNone(self.storage.get(State, other.id))
+        self.assertEqual(self.storage.count(State), 1)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_compaction_threshold(self):
+        """Test that the journal is folded into the file when full"""
+        FileStorage._FileStorage__journal_max = 2
+        for name in ["California", "Nevada"]:
+            self.storage.new(State(name=name))
+            self.storage.save()
+        self.assertFalse(os.path.exists(self.path + ".journal"))
+        with open(self.path, "r") as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_torn_record(self):
+        """Test that an interrupted append does not break reload"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.path + ".journal", "a") as f:
+            f.write('{"key": "State.')
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 1)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_append_after_torn_record(self):
+        """Test that a save after an interrupted append is replayed"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.path + ".journal", "a") as f:
+            f.write('{"key": "State.')
+        other = State(name="Nevada")
+        self.storage.new(other)
+        self.storage.save()
+        self.assertEqual([r["key"] for r in self.journal_lines()],
+                         ["State." + state.id, "State." + other.id])
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, other.id).name, "Nevada")
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_failed_append_truncated(self):
+        """Test that a failed append leaves no partial record behind"""
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        size = os.path.getsize(self.path + ".journal")
+        self.storage.new(State(name="Nevada"))
+        with mock.patch.object(file_storage.os, "fsync",
+                               side_effect=OSError):
+            FileStorage._FileStorage__durability = "file"
+            with self.assertRaises(OSError):
+                self.storage.save()
+        FileStorage._FileStorage__durability = "none"
+        self.assertEqual(os.path.getsize(self.path + ".journal"), size)
+        self.storage.save()
+        self.assertEqual(len(self.journal_lines()), 2)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_compact_interrupted(self):
+        """Test that a journal left by a crashed compaction replays right"""
+        state = State(name="California")
+        other = State(name="Nevada")
+        self.storage.new(state)
+        self.storage.new(other)
+        self.storage.save()
+        state.name = "Arizona"
+        self.storage.new(state)
+        self.storage.delete(other)
+        # the process dies once the file is replaced, before the journal
+        # is removed
+        with mock.patch.object(file_storage.os, "remove",
+                               side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.storage.compact()
+        self.assertTrue(os.path.exists(self.path + ".journal"))
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, state.id).name, "Arizona")
+        self.assertIsNone(self.storage.get(State, other.id))
+
+
+class TestFileStorageSerializedCache(TmpFileStorageTestCase):
+    """Test that FileStorage only serializes changed objects"""
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_only_changed_serialized(self):
+        """Test that save only calls to_dict on objects passed to new"""
+        states = [State(name=str(i)) for i in range(3)]
+        for state in states:
+            self.storage.new(state)
+        self.storage.save()
+        with mock.patch.object(State, "to_dict",
+                               autospec=True,
+                               side_effect=State.to_dict) as to_dict:
+            self.storage.save()
+            self.assertEqual(to_dict.call_count, 0)
+            states[1].name = "changed"
+            self.storage.new(states[1])
+            self.storage.save()
+            self.assertEqual(to_dict.call_count, 1)
+        with open(self.path, "r") as f:
+            saved = json.load(f)
+        self.assertEqual(saved["State." + states[1].id]["name"], "changed")
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_fills_cache(self):
+        """Test that objects read from the file are not serialized again"""
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        self.forget()
+        self.storage.reload()
+        with mock.patch.object(State, "to_dict") as to_dict:
+            self.storage.save()
+            self.assertFalse(to_dict.called)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_deleted_not_saved(self):
+        """Test that a deleted object leaves the file"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.delete(state)
+        self.storage.save()
+        with open(self.path, "r") as f:
+            self.assertEqual(json.load(f), {})
+
+
+class TestFileStorageClose(TmpFileStorageTestCase):
+    """Test that close only reloads a file changed by someone else"""
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_close_after_save(self):
+        """Test that close does not re-read what this process wrote"""
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        with mock.patch.object(FileStorage,
+                               "_FileStorage__refresh") as reload:
+            self.storage.close()
+            self.assertFalse(reload.called)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_close_after_reload(self):
+        """Test that close does not re-read an unchanged file"""
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        self.storage.reload()
+        with mock.patch.object(FileStorage,
+                               "_FileStorage__refresh") as reload:
+            self.storage.close()
+            self.storage.close()
+            self.assertFalse(reload.called)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_close_external_change(self):
+        """Test that close reloads a file written without the lock file"""
+        state = State(name="Nevada")
+        with open(self.path, "w") as f:
+            json.dump({"State." + state.id: state.to_dict()}, f)
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, state.id).name, "Nevada")
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_close_generation(self):
+        """Test that close trusts a generation matching the lock file"""
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        with mock.patch.object(FileStorage,
+                               "_FileStorage__signature") as signature:
+            self.storage.close()
+            self.assertFalse(signature.called)
+        state = State(name="Nevada")
+        with open(self.path, "w") as f:
+            json.dump({"State." + state.id: state.to_dict()}, f)
+        self.storage.close()
+        self.assertIsNone(self.storage.get(State, state.id))
+        with open(self.path + ".lock", "wb") as f:
+            f.write(b"%020d" % 2)
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, state.id).name, "Nevada")
+
+
+class TestFileStorageReadErrors(TmpFileStorageTestCase):
+    """Test how FileStorage reads back users and unreadable files"""
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_user(self):
+        """Test that a reloaded user keeps its hashed password"""
+        user = User(email="a@b.c", password="secret")
+        self.storage.new(user)
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(self.storage.get(User, user.id).password,
+                         user.password)
+        self.assertNotEqual(user.password, "secret")
+        self.assertEqual(self.storage.count(State), 1)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_missing_file(self):
+        """Test that reload of a missing file loads nothing"""
+        self.storage.reload()
+        self.assertEqual(self.storage.all(), {})
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_empty_file(self):
+        """Test that reload of an empty file loads nothing, then saves"""
+        open(self.path, "w").close()
+        self.storage.reload()
+        self.assertEqual(self.storage.all(), {})
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, state.id).name, "California")
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_corrupt_file(self):
+        """Test that a file unreadable partway is never written over"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.path, "r") as f:
+            text = f.read()
+        with open(self.path, "w") as f:
+            f.write(text[:-1] + ', "State.1": {"__class__": "Nope"}}')
+        self.forget()
+        with self.assertRaises(KeyError):
+            self.storage.reload()
+        self.storage.new(State(name="Nevada"))
+        with self.assertRaises(OSError):
+            self.storage.save()
+        with open(self.path, "r") as f:
+            self.assertIn("Nope", f.read())
+
+
+class TestFileStorageIndexes(TmpFileStorageTestCase):
+    """Test the foreign key indexes of FileStorage"""
+    def setUp(self):
+        """Make the temporary storage the one used by the models"""
+        super().setUp()
+        patcher = mock.patch.object(models, "storage", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_by(self):
+        """Test that all_by returns the objects with the given value"""
+        state = State(name="California")
+        cities = [City(name=str(i), state_id=state.id) for i in range(3)]
+        other = City(name="Reno", state_id="other")
+        for obj in [state, other] + cities:
+            self.storage.new(obj)
+        found = self.storage.all_by(City, "state_id", state.id)
+        self.assertEqual(list(found.values()), cities)
+        self.assertEqual(self.storage.all_by("City", "state_id", "x"), {})
+        self.assertEqual(list(self.storage.all_by(State, "name",
+                                                  "California")),
+                         ["State." + state.id])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_attribute_change(self):
+        """Test that changing a foreign key moves the object"""
+        state = State(name="California")
+        city = City(name="San Francisco", state_id=state.id)
+        self.storage.new(state)
+        self.storage.new(city)
+        self.assertEqual(state.cities, [city])
+        city.state_id = "other"
+        self.assertEqual(state.cities, [])
+        self.assertEqual(list(self.storage.all_by(City, "state_id",
+                                                  "other").values()),
+                         [city])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_delete_and_replace(self):
+        """Test that deleted or replaced objects leave the index"""
+        place = Place(name="Loft")
+        review = Review(text="Nice", place_id=place.id)
+        self.storage.new(place)
+        self.storage.new(review)
+        self.assertEqual(place.reviews, [review])
+        copy = Review(**review.to_dict())
+        self.storage.new(copy)
+        self.assertEqual(place.reviews, [copy])
+        self.storage.delete(copy)
+        self.assertEqual(place.reviews, [])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_indexes(self):
+        """Test that objects read from the file are indexed"""
+        city = City(name="San Francisco")
+        place = Place(name="Loft", city_id=city.id, user_id="user")
+        self.storage.new(city)
+        self.storage.new(place)
+        self.storage.save()
+        self.forget()
+        self.storage.reload()
+        city = self.storage.get(City, city.id)
+        self.assertEqual([p.id for p in city.places], [place.id])
+        self.assertEqual(len(self.storage.all_by(Place, "user_id",
+                                                 "user")), 1)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_place_amenities(self):
+        """Test that Place.amenities follows amenity_ids"""
+        amenity = Amenity(name="Wifi")
+        place = Place(name="Loft", amenity_ids=[amenity.id, "missing"])
+        self.storage.new(amenity)
+        self.storage.new(place)
+        self.assertEqual(place.amenities, [amenity])
+
+
+class TestFileStorageAtomicWrite(TmpFileStorageTestCase):
+    """Test the atomic writes and durability levels of FileStorage"""
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_no_temporary_left(self):
+        """Test that a save leaves only the JSON and lock files behind"""
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        self.assertEqual(sorted(os.listdir(self.tmp)),
+                         ["file.json", "file.json.lock"])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_failed_write_keeps_file(self):
+        """Test that a failed save keeps the previous file intact"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.path, "r") as f:
+            before = f.read()
+        self.storage.new(State(name="Nevada"))
+        with mock.patch("os.replace", side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.storage.save()
+        with open(self.path, "r") as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(sorted(os.listdir(self.tmp)),
+                         ["file.json", "file.json.lock"])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_durability_levels(self):
+        """Test the number of fsync calls of each durability level"""
+        for durability, fsyncs in [("none", 0), ("file", 1), ("dir", 2)]:
+            with self.subTest(durability=durability):
+                FileStorage._FileStorage__durability = durability
+                self.storage.new(State(name=durability))
+                with mock.patch("os.fsync") as fsync:
+                    self.storage.save()
+                self.assertEqual(fsync.call_count, fsyncs)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_unknown_durability(self):
+        """Test that an unknown durability level is refused"""
+        FileStorage._FileStorage__durability = "always"
+        with self.assertRaises(ValueError):
+            self.storage.save()
+
+
+class TestFileStorageGroupCommit(TmpFileStorageTestCase):
+    """Test the coalescing of saves by FileStorage"""
+    def setUp(self):
+        """Hold saves back for a commit window"""
+        super().setUp()
+        FileStorage._FileStorage__commit_window = 0.05
+        write = FileStorage._FileStorage__write
+        patcher = mock.patch.object(FileStorage, "_FileStorage__write",
+                                    autospec=True, side_effect=write)
+        self.write = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def save_from_threads(self, number):
+        """Creates and saves number states from as many threads"""
+        def create(i):
+            """Creates and saves one state"""
+            State(name=str(i)).save()
+        threads = [threading.Thread(target=create, args=(i,))
+                   for i in range(number)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_saves_coalesced(self):
+        """Test that saves made during the window share one write"""
+        with mock.patch.object(models, "storage", self.storage):
+            self.save_from_threads(10)
+        self.assertEqual(self.write.call_count, 1)
+        with open(self.path, "r") as f:
+            self.assertEqual(len(json.load(f)), 10)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_commit_max(self):
+        """Test that commit_max saves are written before the window ends"""
+        FileStorage._FileStorage__commit_window = 60
+        FileStorage._FileStorage__commit_max = 5
+        with mock.patch.object(models, "storage", self.storage):
+            self.save_from_threads(5)
+        self.assertEqual(self.write.call_count, 1)
+        self.assertTrue(os.path.exists(self.path))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_no_wait(self):
+        """Test that save(wait=False) returns before the write"""
+        FileStorage._FileStorage__commit_window = 60
+        self.storage.new(State(name="California"))
+        self.storage.save(wait=False)
+        self.assertFalse(os.path.exists(self.path))
+        self.storage.flush()
+        self.assertEqual(self.write.call_count, 1)
+        self.assertTrue(os.path.exists(self.path))
+        self.storage.flush()
+        self.assertEqual(self.write.call_count, 1)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_failed_write(self):
+        """Test that waiting saves get the error of their write"""
+        self.write.side_effect = OSError
+        self.storage.new(State(name="California"))
+        with self.assertRaises(OSError):
+            self.storage.save()
+        self.assertEqual(FileStorage._FileStorage__failed, [])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_failed_writes(self):
+        """Test that a later failed write hides no earlier error"""
+        FileStorage._FileStorage__commit_window = 60
+        errors = []
+        self.write.side_effect = [OSError("first"), OSError("second"),
+                                  None]
+
+        def save():
+            """Saves and records the error raised"""
+            try:
+                self.storage.save()
+                errors.append(None)
+            except OSError as e:
+                errors.append(str(e))
+        threads = []
+        for i in range(3):
+            self.storage.new(State(name=str(i)))
+            threads.append(threading.Thread(target=save))
+            threads[-1].start()
+            while FileStorage._FileStorage__requested <= i:
+                time.sleep(0.001)
+            if i < 2:
+                with self.assertRaises(OSError):
+                    self.storage.flush()
+        self.storage.flush()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(errors, key=str), [None, "first", "second"])
+        self.assertEqual(FileStorage._FileStorage__failed, [])
+
+
+class TestFileStorageLazy(TmpFileStorageTestCase):
+    """Test the lazy mode of FileStorage"""
+    def setUp(self):
+        """Save a few objects and reload them in lazy mode"""
+        super().setUp()
+        self.state = State(name="California")
+        self.city = City(name="San Francisco", state_id=self.state.id)
+        self.user = User(email="a@b.c")
+        for obj in (self.state, self.city, self.user):
+            self.storage.new(obj)
+        self.storage.save()
+        self.forget()
+        FileStorage._FileStorage__lazy = True
+        self.storage.reload()
+
+    def built(self):
+        """Returns the keys of the objects built so far"""
+        return set(FileStorage._FileStorage__objects)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_builds_nothing(self):
+        """Test that reload keeps records and counts them"""
+        self.assertEqual(self.built(), set())
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(self.storage.count(State), 1)
+        self.assertEqual(self.built(), set())
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_get_builds_one(self):
+        """Test that get builds only the object asked for"""
+        state = self.storage.get(State, self.state.id)
+        self.assertIs(type(state), State)
+        self.assertEqual(state.name, "California")
+        self.assertEqual(state.created_at, self.state.created_at)
+        self.assertEqual(self.built(), {"State." + self.state.id})
+        self.assertIs(self.storage.get(State, self.state.id), state)
+        self.assertEqual(self.storage.count(), 3)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_cls_builds_cls(self):
+        """Test that all(cls) and all_by build the class asked for"""
+        self.assertEqual(list(self.storage.all(User)),
+                         ["User." + self.user.id])
+        self.assertEqual(self.built(), {"User." + self.user.id})
+        state = self.storage.get(State, self.state.id)
+        self.assertEqual([city.id for city in state.cities],
+                         [self.city.id])
+        self.assertEqual(len(self.storage.all()), 3)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_keeps_records(self):
+        """Test that save writes the records that were never built"""
+        self.storage.get(State, self.state.id).save()
+        self.assertEqual(self.built(), {"State." + self.state.id})
+        with open(self.path, "r") as f:
+            self.assertEqual(len(json.load(f)), 3)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_delete_record(self):
+        """Test that a deleted object does not come back"""
+        self.storage.delete(self.storage.get(User, self.user.id))
+        self.storage.save()
+        self.assertIsNone(self.storage.get(User, self.user.id))
+        self.assertEqual(self.storage.count(), 2)
+
+
+class TestFileStorageInterning(TmpFileStorageTestCase):
+    """Test that reload interns class names and ids"""
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_interns_ids(self):
+        """Test that equal ids loaded from the file are one string"""
+        user = User(email="a@b.c")
+        place = Place(user_id=user.id, amenity_ids=["1"])
+        reviews = [Review(user_id=user.id, place_id=place.id)
+                   for i in range(2)]
+        for obj in [user, place] + reviews:
+            self.storage.new(obj)
+        self.storage.save()
+        self.forget()
+        self.storage.reload()
+        user = self.storage.get(User, user.id)
+        place = self.storage.get(Place, place.id)
+        reviews = [self.storage.get(Review, review.id) for review in reviews]
+        self.assertIs(place.user_id, user.id)
+        self.assertIs(place.amenity_ids[0], sys.intern("1"))
+        for review in reviews:
+            self.assertIs(review.user_id, user.id)
+            self.assertIs(review.place_id, place.id)
+        records = FileStorage._FileStorage__serialized
+        self.assertIs(records["Review." + reviews[0].id]["__class__"],
+                      records["Review." + reviews[1].id]["__class__"])
+
+
+class TestFileStorageShards(TmpFileStorageTestCase):
+    """Test the sharded mode of FileStorage"""
+    def setUp(self):
+        """Store each class in its own file"""
+        super().setUp()
+        FileStorage._FileStorage__shards = 1
+        self.state = State(name="California")
+        self.city = City(name="San Francisco", state_id=self.state.id)
+        self.user = User(email="a@b.c")
+        for obj in (self.state, self.city, self.user):
+            self.storage.new(obj)
+        self.storage.save()
+
+    def shard(self, name):
+        """Returns the path of the file of class name"""
+        return os.path.join(self.tmp, "file.{}.json".format(name))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_files_per_class(self):
+        """Test that each class is written to its own file"""
+        self.assertFalse(os.path.exists(self.path))
+        with open(self.shard("City"), "r") as f:
+            self.assertEqual(list(json.load(f)), ["City." + self.city.id])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_writes_changed_files(self):
+        """Test that save only replaces the files of changed objects"""
+        with mock.patch.object(file_storage, "atomic_open",
+                               wraps=file_storage.atomic_open) as m:
+            self.storage.new(Review(place_id="1", user_id=self.user.id))
+            self.storage.save()
+            self.storage.delete(self.city)
+            self.storage.save()
+        self.assertEqual([c[0][0] for c in m.call_args_list],
+                         [self.shard("Review"), self.shard("City")])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_classes(self):
+        """Test that reload reads the listed classes, others on access"""
+        FileStorage._FileStorage__classes = ["State"]
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(list(FileStorage._FileStorage__objects),
+                         ["State." + self.state.id])
+        state = self.storage.get(State, self.state.id)
+        self.assertEqual([city.id for city in state.cities], [self.city.id])
+        self.assertEqual(self.storage.count(), 3)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_new_reads_class_first(self):
+        """Test that saving an unread class keeps its stored objects"""
+        FileStorage._FileStorage__classes = ["State"]
+        self.forget()
+        self.storage.reload()
+        self.storage.new(User(email="d@e.f"))
+        self.storage.save()
+        with open(self.shard("User"), "r") as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_hash_shards(self):
+        """Test that objects spread over the shards of their class"""
+        FileStorage._FileStorage__shards = 4
+        users = [User(email=str(i)) for i in range(40)]
+        for user in users:
+            self.storage.new(user)
+        self.storage.save()
+        for shard in range(4):
+            path = os.path.join(self.tmp, "file.User.{}.json".format(shard))
+            with open(path, "r") as f:
+                self.assertTrue(json.load(f))
+        self.forget()
+        self.storage.reload()
+        # the user of setUp is written with the shard it falls in
+        self.assertEqual(self.storage.count(User), 41)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_journal_compaction(self):
+        """Test that a compaction writes the files of journaled changes"""
+        FileStorage._FileStorage__journal = True
+        self.storage.delete(self.user)
+        self.storage.save()
+        self.forget()
+        self.storage.reload()
+        self.assertIsNone(self.storage.get(User, self.user.id))
+        self.storage.compact()
+        self.assertFalse(os.path.exists(self.path + ".journal"))
+        with open(self.shard("User"), "r") as f:
+            self.assertEqual(json.load(f), {})
+
+
+class TestFileStoragePickle(TmpFileStorageTestCase):
+    """Test FileStorage with the pickle format"""
+    def setUp(self):
+        """Save a few objects in the pickle format"""
+        super().setUp()
+        FileStorage._FileStorage__format = "pickle"
+        self.state = State(name="California")
+        self.city = City(name="San Francisco", state_id=self.state.id)
+        for obj in (self.state, self.city):
+            self.storage.new(obj)
+        self.storage.save()
+        self.forget()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_file(self):
+        """Test that objects are written to file.pickle"""
+        self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, "file.pickle")))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload(self):
+        """Test that reload reads the objects back"""
+        self.storage.reload()
+        city = self.storage.get(City, self.city.id)
+        self.assertEqual(city.name, "San Francisco")
+        self.assertEqual(city.created_at, self.city.created_at)
+        self.assertIs(city.state_id, self.storage.get(State,
+                                                      self.state.id).id)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_shards(self):
+        """Test that shards use the extension of the format"""
+        FileStorage._FileStorage__shards = 1
+        self.storage.new(State(name="Nevada"))
+        self.storage.save()
+        path = os.path.join(self.tmp, "file.State.pickle")
+        self.assertTrue(os.path.exists(path))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_unknown_format(self):
+        """Test that an unknown format raises ValueError"""
+        FileStorage._FileStorage__format = "yaml"
+        with self.assertRaises(ValueError):
+            self.storage.save()
+
+
+class TestFileStorageCompression(TmpFileStorageTestCase):
+    """Test FileStorage with compressed files"""
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_round_trip(self):
+        """Test that each format is read back under each compression"""
+        for compression, ext in [("gzip", ".gz"), ("bz2", ".bz2"),
+                                 ("lzma", ".xz")]:
+            for fmt in ["json", "pickle"]:
+                with self.subTest(compression=compression, format=fmt):
+                    FileStorage._FileStorage__compression = compression
+                    FileStorage._FileStorage__format = fmt
+                    state = State(name="California")
+                    self.storage.new(state)
+                    self.storage.save()
+                    path = os.path.join(self.tmp, "file." + fmt + ext)
+                    self.assertTrue(os.path.exists(path))
+                    self.forget()
+                    self.storage.reload()
+                    self.assertEqual(
+                        self.storage.get(State, state.id).name,
+                        "California")
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_gzip_file(self):
+        """Test that the gzip file holds the JSON of the objects"""
+        FileStorage._FileStorage__compression = "gzip"
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        with gzip.open(self.path + ".gz", "rt") as f:
+            self.assertEqual(list(json.load(f)), ["State." + state.id])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_level(self):
+        """Test that HBNB_FILE_COMPRESSION_LEVEL sets the gzip level"""
+        FileStorage._FileStorage__compression = "gzip"
+        FileStorage._FileStorage__compression_level = "1"
+        with mock.patch("gzip.open", wraps=gzip.open) as m:
+            self.storage.save()
+        self.assertEqual(m.call_args[1], {"compresslevel": 1})
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_unknown_compression(self):
+        """Test that an unknown compression raises ValueError"""
+        FileStorage._FileStorage__compression = "zip"
+        with self.assertRaises(ValueError):
+            self.storage.save()
+
+
+class TestFileStorageThreads(TmpFileStorageTestCase):
+    """Test FileStorage shared by threads"""
+    def hammer(self, threads=8, rounds=40):
+        """Runs threads creating, reading, saving and deleting objects"""
+        errors = []
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+
+        def work():
+            """Creates cities, reads them back and deletes half of them"""
+            try:
+                for i in range(rounds):
+                    city = City(name=str(i), state_id=state.id)
+                    self.storage.new(city)
+                    if i % 4 == 0:
+                        self.storage.save()
+                    self.assertIs(self.storage.get(City, city.id), city)
+                    self.assertIn(city, state.cities)
+                    for obj in self.storage.all(City).values():
+                        obj.to_dict()
+                    self.storage.count()
+                    if i % 2:
+                        self.storage.delete(city)
+                self.storage.save()
+            except Exception as e:
+                errors.append(e)
+
+        workers = [threading.Thread(target=work) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        expected = threads * rounds // 2
+        self.assertEqual(self.storage.count(City), expected)
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(self.storage.count(City), expected)
+        self.assertEqual(len(self.storage.get(State, state.id).cities),
+                         expected)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_threads(self):
+        """Test concurrent changes and saves of the JSON file"""
+        self.hammer()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_threads_journal_shards(self):
+        """Test concurrent changes with the journal and shards"""
+        FileStorage._FileStorage__journal = True
+        FileStorage._FileStorage__journal_max = 50
+        FileStorage._FileStorage__shards = 4
+        self.hammer()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_threads_commit_window(self):
+        """Test concurrent saves grouped by the commit window"""
+        FileStorage._FileStorage__commit_window = 0.005
+        self.hammer()
+
+
+class TestFileStorageSnapshots(TmpFileStorageTestCase):
+    """Test the read only snapshots of FileStorage"""
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_read_only(self):
+        """Test that a snapshot cannot be changed"""
+        state = State(name="California")
+        self.storage.new(state)
+        for snapshot in (self.storage.snapshot(),
+                         self.storage.snapshot(State)):
+            self.assertEqual(dict(snapshot), {"State." + state.id: state})
+            with self.assertRaises(TypeError):
+                snapshot["State." + state.id] = None
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_shared_until_change(self):
+        """Test that a snapshot is copied again only after a change"""
+        state = State(name="California")
+        self.storage.new(state)
+        snapshot = self.storage.snapshot(State)
+        everything = self.storage.snapshot()
+        self.assertIs(self.storage.snapshot(State), snapshot)
+        self.assertIs(self.storage.snapshot("State"), snapshot)
+        self.assertIs(self.storage.snapshot(), everything)
+        self.storage.new(City(name="Fresno", state_id=state.id))
+        self.assertIs(self.storage.snapshot(State), snapshot)
+        self.assertIsNot(self.storage.snapshot(), everything)
+        self.storage.new(state)
+        self.assertIs(self.storage.snapshot(State), snapshot)
+        self.storage.delete(state)
+        self.assertEqual(len(self.storage.snapshot(State)), 0)
+        self.assertEqual(list(snapshot), ["State." + state.id])
+        self.assertEqual(len(everything), 1)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload(self):
+        """Test that a snapshot taken before a reload is not reused"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        snapshot = self.storage.snapshot(State)
+        self.storage.reload()
+        self.assertIsNot(self.storage.snapshot(State), snapshot)
+        self.assertIsNot(self.storage.snapshot(State)["State." + state.id],
+                         state)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_lazy(self):
+        """Test that a snapshot builds the objects of lazy mode"""
+        FileStorage._FileStorage__lazy = True
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(self.storage.snapshot(State)["State." + state.id]
+                         .name, "California")
+        self.assertEqual(list(self.storage.snapshot()),
+                         ["State." + state.id])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_iterate_while_changed(self):
+        """Test that a snapshot is iterated while a thread changes objects"""
+        for i in range(100):
+            self.storage.new(State(name=str(i)))
+        done = threading.Event()
+
+        def work():
+            """Adds and deletes states until the iterations are done"""
+            while not done.is_set():
+                state = State(name="new")
+                self.storage.new(state)
+                self.storage.delete(state)
+
+        worker = threading.Thread(target=work)
+        worker.start()
+        try:
+            for i in range(200):
+                names = [obj.name for obj in
+                         self.storage.snapshot(State).values()]
+                self.assertEqual(names.count("new"), len(names) - 100)
+        finally:
+            done.set()
+            worker.join()
+
+
+class TestFileStorageQuery(TmpFileStorageTestCase):
+    """Test the query method of FileStorage"""
+    def setUp(self):
+        """Store states, and cities named by their population"""
+        super().setUp()
+        self.states = [State(name=name) for name in ("A", "B")]
+        self.cities = []
+        for i, population in enumerate([3, 1, 4, 1, 5, 9]):
+            city = City(name=str(i), population=population,
+                        state_id=self.states[i % 2].id)
+            self.cities.append(city)
+        for obj in self.states + self.cities:
+            self.storage.new(obj)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_where(self):
+        """Test that query keeps the objects matching where"""
+        a, b = self.states
+        self.assertEqual(set(self.storage.query(City)), set(self.cities))
+        self.assertEqual(set(self.storage.query(
+            "City", where={"state_id": a.id})), set(self.cities[::2]))
+        self.assertEqual(self.storage.query(
+            City, where={"state_id": a.id, "population": 4}),
+            [self.cities[2]])
+        self.assertEqual(set(self.storage.query(
+            City, where={"population": [1, 9]})),
+            {self.cities[1], self.cities[3], self.cities[5]})
+        self.assertEqual(self.storage.query(
+            City, where={"state_id": [a.id, b.id], "name": "5"}),
+            [self.cities[5]])
+        self.assertEqual(self.storage.query(City, where={"state_id": []}),
+                         [])
+        self.assertEqual(self.storage.query(City, where={"name": "x"}), [])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_where_id(self):
+        """Test that query looks objects up by id"""
+        ids = [self.cities[0].id, self.cities[1].id, "missing"]
+        self.assertEqual(set(self.storage.query(City, where={"id": ids})),
+                         set(self.cities[:2]))
+        self.assertEqual(self.storage.query(
+            City, where={"id": ids, "population": 3}), [self.cities[0]])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_index_lookup(self):
+        """Test that query only checks the objects found by an index"""
+        a = self.states[0]
+        with mock.patch.object(FileStorage, "snapshot") as snapshot:
+            self.assertEqual(len(self.storage.query(
+                City, where={"population": 1, "state_id": a.id})), 0)
+            self.assertFalse(snapshot.called)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_order_limit_offset(self):
+        """Test that query sorts then pages the objects"""
+        names = [city.name for city in self.storage.query(
+            City, order_by=["population", "-name"])]
+        self.assertEqual(names, ["3", "1", "0", "2", "4", "5"])
+        names = [city.name for city in self.storage.query(
+            City, order_by="-population", limit=2)]
+        self.assertEqual(names, ["5", "4"])
+        names = [city.name for city in self.storage.query(
+            City, order_by=["population", "name"], limit=3, offset=2)]
+        self.assertEqual(names, ["0", "2", "4"])
+        names = [city.name for city in self.storage.query(
+            City, order_by=["population", "-name"], limit=2, offset=1)]
+        self.assertEqual(names, ["1", "0"])
+        self.assertEqual(len(self.storage.query(City, offset=4)), 2)
+        self.assertEqual(self.storage.query(City, limit=0), [])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_after(self):
+        """Test that query keeps the objects after a keyset"""
+        order = ["population", "-name"]
+        first = self.storage.query(City, order_by=order, limit=2)
+        self.assertEqual([city.name for city in first], ["3", "1"])
+        last = first[-1]
+        names = [city.name for city in self.storage.query(
+            City, order_by=order, limit=3,
+            after=(last.population, last.name))]
+        self.assertEqual(names, ["0", "2", "4"])
+        names = [city.name for city in self.storage.query(
+            City, where={"state_id": self.states[1].id},
+            order_by=["-population", "name"], after=(9, "5"))]
+        self.assertEqual(names, ["1", "3"])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_each(self):
+        """Test that each iterates over the objects matching where"""
+        self.assertEqual(set(self.storage.each(City)), set(self.cities))
+        self.assertEqual(
+            set(self.storage.each(City, {"state_id": self.states[0].id})),
+            set(self.cities[::2]))
+        objs = self.storage.each(City)
+        self.storage.delete(self.cities[0])
+        self.assertEqual(len(list(objs)), 6)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_missing_values_first(self):
+        """Test that objects missing the sort attribute come first"""
+        city = City(name="none")
+        self.storage.new(city)
+        self.assertIs(self.storage.query(City, order_by="population")[0],
+                      city)
+        self.assertIs(self.storage.query(City, order_by="-population")[-1],
+                      city)
+
+
+class TestFileStorageSearchIndexes(TmpFileStorageTestCase):
+    """Test the amenity and keyset order indexes of FileStorage"""
+    def setUp(self):
+        """Store places with the amenities their index is a multiple of"""
+        super().setUp()
+        self.amenities = [Amenity(name=str(i)) for i in range(1, 4)]
+        self.places = []
+        for i in range(12):
+            place = Place(name=str(i), city_id=str(i % 2))
+            place.amenity_ids = [amenity.id for j, amenity in
+                                 enumerate(self.amenities, 1) if i % j == 0]
+            self.places.append(place)
+        for obj in self.amenities + self.places:
+            self.storage.new(obj)
+
+    def having(self, *numbers):
+        """Returns the set of the places having the amenities numbers"""
+        return {place for i, place in enumerate(self.places)
+                if all(i % j == 0 for j in numbers)}
+
+    def ids(self, *numbers):
+        """Returns the ids of the amenities numbers"""
+        return [self.amenities[j - 1].id for j in numbers]
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_amenities(self):
+        """Test that query keeps the places having every amenity given"""
+        self.assertEqual(set(self.storage.query(
+            Place, where={"amenity_ids": self.ids(2)})), self.having(2))
+        self.assertEqual(set(self.storage.query(
+            Place, where={"amenity_ids": self.ids(2, 3)})),
+            self.having(2, 3))
+        self.assertEqual(set(self.storage.query(
+            Place, where={"amenity_ids": self.ids(2, 3), "city_id": "0"})),
+            self.having(2, 3))
+        self.assertEqual(self.storage.query(
+            Place, where={"amenity_ids": self.ids(3), "city_id": "1"}),
+            [self.places[3], self.places[9]])
+        self.assertEqual(self.storage.query(
+            Place, where={"amenity_ids": ["missing"]}), [])
+        self.assertEqual(set(self.storage.query(
+            Place, where={"amenity_ids": []})), set(self.places))
+        self.assertEqual(set(self.storage.all_by(
+            Place, "amenity_ids", self.ids(3)[0]).values()), self.having(3))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_changes(self):
+        """Test that the amenity index follows the saved changes"""
+        place = self.places[1]
+        place.amenity_ids.append(self.ids(3)[0])
+        self.storage.new(place)
+        self.assertIn(place, self.storage.query(
+            Place, where={"amenity_ids": self.ids(3)}))
+        place.amenity_ids.clear()
+        self.storage.new(place)
+        self.assertNotIn(place, self.storage.query(
+            Place, where={"amenity_ids": self.ids(1)}))
+        self.storage.delete(self.places[0])
+        self.assertEqual(set(self.storage.query(
+            Place, where={"amenity_ids": self.ids(3)})),
+            self.having(3) - {self.places[0]})
+        self.storage.save()
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(len(self.storage.query(
+            Place, where={"amenity_ids": self.ids(3)})), 3)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_keyset_walk(self):
+        """Test that keyset pages are read from the sorted objects"""
+        order = ["created_at", "id"]
+        expected = sorted(self.places, key=lambda p: (p.created_at, p.id))
+        with mock.patch.object(file_storage.heapq, "nsmallest") as heap:
+            page = self.storage.query(Place, order_by=order, limit=5)
+            self.assertEqual(page, expected[:5])
+            last = page[-1]
+            self.assertEqual(self.storage.query(
+                Place, order_by=order, limit=5,
+                after=(last.created_at, last.id)), expected[5:10])
+            self.assertEqual(self.storage.query(
+                Place, order_by=order, limit=1, offset=1,
+                where={"city_id": "0"}),
+                [place for place in expected if place.city_id == "0"][1:2])
+            self.assertEqual(self.storage.query(Place, order_by=order),
+                             expected)
+            self.assertFalse(heap.called)
+        self.assertEqual(self.storage.query(
+            Place, order_by=order, limit=1, where={"name": "11"}),
+            [self.places[11]])
+        self.storage.delete(expected[0])
+        self.assertEqual(self.storage.query(Place, order_by=order, limit=1),
+                         [expected[1]])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_unindexable(self):
+        """Test that an object that cannot be indexed is not stored"""
+        order = ["created_at", "id"]
+        expected = self.storage.query(Place, order_by=order)
+        place = Place(name="new")
+        place.amenity_ids = 5
+        with self.assertRaises(TypeError):
+            self.storage.new(place)
+        self.assertIsNone(self.storage.get(Place, place.id))
+        place = Place(name="aware")
+        place.created_at = place.created_at.replace(tzinfo=timezone.utc)
+        with self.assertRaises(TypeError):
+            self.storage.new(place)
+        self.assertIsNone(self.storage.get(Place, place.id))
+        place = self.places[1]
+        place.amenity_ids = 5
+        with self.assertRaises(TypeError):
+            self.storage.new(place)
+        self.assertEqual(self.storage.query(Place, order_by=order), expected)
+        self.assertIn(place, self.storage.query(
+            Place, where={"amenity_ids": self.ids(1)}))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_keyset_sharded_reload(self):
+        """Test that reload sorts the objects once, not one by one"""
+        order = ["created_at", "id"]
+        expected = sorted(self.places, key=lambda p: (p.created_at, p.id))
+        FileStorage._FileStorage__shards = 3
+        self.storage.save()
+        for lazy in (False, True):
+            FileStorage._FileStorage__lazy = lazy
+            self.forget()
+            with mock.patch.object(file_storage.bisect, "insort") as insort:
+                self.storage.reload()
+                self.assertEqual([place.id for place in self.storage.query(
+                    Place, order_by=order)], [place.id for place in expected])
+                self.assertFalse(insort.called)
+            self.assertIsNone(FileStorage._FileStorage__unsorted)
+            self.storage.delete(self.storage.get(Place, expected[0].id))
+            self.assertEqual(self.storage.query(
+                Place, order_by=order, limit=1)[0].id, expected[1].id)
+            self.storage.new(expected[0])
+
+
+class TestFileStorageProcesses(TmpFileStorageTestCase):
+    """Test FileStorage shared by processes through the lock file"""
+    def run_processes(self, target, processes=4):
+        """Runs target in forked processes and checks they succeeded"""
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=target) for i in range(processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual([worker.exitcode for worker in workers],
+                         [0] * processes)
+
+    def hammer(self, processes=4, rounds=25):
+        """Runs processes each creating and saving cities"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+
+        def work():
+            """Creates cities, saving each of them"""
+            for i in range(rounds):
+                self.storage.new(City(name=str(i), state_id=state.id))
+                self.storage.save()
+                self.storage.close()
+
+        self.run_processes(work, processes)
+        self.storage.close()
+        self.assertEqual(self.storage.count(City), processes * rounds)
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(self.storage.count(City), processes * rounds)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    @unittest.skipIf(file_storage.fcntl is None, "no file locks")
+    def test_processes(self):
+        """Test concurrent saves of the JSON file by processes"""
+        self.hammer()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    @unittest.skipIf(file_storage.fcntl is None, "no file locks")
+    def test_processes_journal_shards(self):
+        """Test concurrent saves of the journal and shards by processes"""
+        FileStorage._FileStorage__journal = True
+        FileStorage._FileStorage__journal_max = 30
+        FileStorage._FileStorage__shards = 4
+        self.hammer()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_generation(self):
+        """Test that each write increments the generation"""
+        self.storage.save()
+        with open(self.path + ".lock", "rb") as f:
+            self.assertEqual(int(f.read()), 1)
+        FileStorage._FileStorage__journal = True
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        with open(self.path + ".lock", "rb") as f:
+            self.assertEqual(int(f.read()), 2)
+        self.assertEqual(FileStorage._FileStorage__generation, 2)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_keeps_other_writes(self):
+        """Test that a save keeps what another process wrote"""
+        self.storage.save()
+        nevada = State(name="Nevada")
+
+        def work():
+            """Saves a state"""
+            self.storage.new(nevada)
+            self.storage.save()
+
+        self.run_processes(work, 1)
+        california = State(name="California")
+        self.storage.new(california)
+        self.storage.save()
+        self.forget()
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, nevada.id).name, "Nevada")
+        self.assertEqual(self.storage.get(State, california.id).name,
+                         "California")
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_close_replays_journal(self):
+        """Test that close only replays the records another process added"""
+        FileStorage._FileStorage__journal = True
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        nevada = State(name="Nevada")
+
+        def work():
+            """Renames a state and saves another one"""
+            state.name = "Golden"
+            self.storage.new(state)
+            self.storage.new(nevada)
+            self.storage.save()
+
+        self.run_processes(work, 1)
+        self.assertEqual(state.name, "California")
+        with mock.patch.object(FileStorage, "_FileStorage__read_file") as read:
+            self.storage.close()
+            self.assertFalse(read.called)
+        self.assertEqual(self.storage.get(State, state.id).name, "Golden")
+        self.assertEqual(self.storage.get(State, nevada.id).name, "Nevada")
+        self.assertEqual(FileStorage._FileStorage__journal_records, 3)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_close_keeps_changes(self):
+        """Test that the changes not saved yet survive a reload"""
+        self.storage.save()
+        state = State(name="California")
+        self.storage.new(state)
+
+        def work():
+            """Saves a state"""
+            self.storage.new(State(name="Nevada"))
+            self.storage.save()
+
+        self.run_processes(work, 1)
+        self.storage.close()
+        self.assertIs(self.storage.get(State, state.id), state)
+        self.assertEqual(self.storage.count(State), 2)
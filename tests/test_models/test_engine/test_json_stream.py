@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""
+Contains the tests of the json_stream module
+"""
+
+import io
+import json
+from models.engine import json_stream
+import pep8
+import unittest
+iter_items = json_stream.iter_items
+
+
+class TestJsonStreamDocs(unittest.TestCase):
+    """Tests to check the documentation and style of json_stream"""
+    def test_pep8_conformance_json_stream(self):
+        """Test that models/engine/json_stream.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/json_stream.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_json_stream(self):
+        """Test tests/test_models/test_engine/test_json_stream.py"""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_json_stream.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_json_stream_module_docstring(self):
+        """Test for the json_stream.py module docstring"""
+        self.assertIsNot(json_stream.__doc__, None,
+                         "json_stream.py needs a docstring")
+
+    def test_iter_items_docstring(self):
+        """Test for the iter_items docstring"""
+        self.assertIsNot(iter_items.__doc__, None,
+                         "iter_items needs a docstring")
+
+
+class TestIterItems(unittest.TestCase):
+    """Test the iter_items function"""
+    document = {
+        "State.1": {"id": "1", "name": "California", "__class__": "State"},
+        "City.2": {"id": "2", "state_id": "1", "__class__": "City",
+                   "tags": ["a, b", "}"], "rank": 12345},
+        "Place.3": {"id": "3", "latitude": 37.7, "description": None}
+    }
+
+    def test_chunk_sizes(self):
+        """Test that every chunk size gives the whole object"""
+        for indent in (None, 4):
+            text = json.dumps(self.document, indent=indent)
+            for chunk_size in (1, 2, 5, 64, 1 << 16):
+                with self.subTest(indent=indent, chunk_size=chunk_size):
+                    items = list(iter_items(io.StringIO(text), chunk_size))
+                    self.assertEqual(items, list(self.document.items()))
+
+    def test_empty_object(self):
+        """Test that an empty object yields nothing"""
+        self.assertEqual(list(iter_items(io.StringIO(" { } "))), [])
+
+    def test_lazy(self):
+        """Test that items are yielded before the end is read"""
+        text = json.dumps(self.document)
+        f = io.StringIO(text)
+        items = iter_items(f, 4)
+        next(items)
+        self.assertLess(f.tell(), len(text))
+
+    def test_invalid(self):
+        """Test that invalid or truncated documents raise ValueError"""
+        for text in ["", "[]", '{"a" 1}', '{"a": {"b": 1}', '{"a": 1,}',
+                     '{1: 2}', '{"a": 1 "b": 2}']:
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    list(iter_items(io.StringIO(text), 2))
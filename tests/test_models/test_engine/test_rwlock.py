@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+"""
+Contains the TestReadWriteLock classes
+"""
+
+from models.engine import rwlock
+import pep8
+import threading
+import unittest
+ReadWriteLock = rwlock.ReadWriteLock
+
+
+class TestReadWriteLockDocs(unittest.TestCase):
+    """Tests to check the documentation and style of ReadWriteLock"""
+    def test_pep8_conformance(self):
+        """Test that rwlock.py and its tests conform to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files([
+            'models/engine/rwlock.py',
+            'tests/test_models/test_engine/test_rwlock.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_docstrings(self):
+        """Test for the module, class and method docstrings"""
+        for obj in (rwlock, ReadWriteLock, ReadWriteLock.read,
+                    ReadWriteLock.write):
+            self.assertTrue(obj.__doc__)
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """Test the ReadWriteLock class"""
+    def setUp(self):
+        """Create an unlocked lock"""
+        self.lock = ReadWriteLock()
+
+    def run_thread(self, target):
+        """Runs target in a thread, returns the thread"""
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        return thread
+
+    def test_readers_share(self):
+        """Test that readers hold the lock together"""
+        inside = threading.Event()
+
+        def read():
+            """Reads while the main thread reads"""
+            with self.lock.read():
+                inside.set()
+
+        with self.lock.read():
+            self.run_thread(read)
+            self.assertTrue(inside.wait(5))
+
+    def test_writer_excludes(self):
+        """Test that a writer waits for readers and keeps them out"""
+        wrote = threading.Event()
+
+        def write():
+            """Writes once the main thread stops reading"""
+            with self.lock.write():
+                wrote.set()
+
+        with self.lock.read():
+            thread = self.run_thread(write)
+            self.assertFalse(wrote.wait(0.1))
+        self.assertTrue(wrote.wait(5))
+        thread.join(5)
+
+    def test_waiting_writer_blocks_readers(self):
+        """Test that readers do not overtake a waiting writer"""
+        order = []
+
+        def write():
+            """Writes once the main thread stops reading"""
+            with self.lock.write():
+                order.append("write")
+
+        def read():
+            """Reads after the writer"""
+            with self.lock.read():
+                order.append("read")
+
+        with self.lock.read():
+            writer = self.run_thread(write)
+            while not self.lock._ReadWriteLock__waiting:
+                writer.join(0.01)
+            reader = self.run_thread(read)
+            reader.join(0.1)
+            self.assertEqual(order, [])
+        writer.join(5)
+        reader.join(5)
+        self.assertEqual(order, ["write", "read"])
+
+    def test_reentrant(self):
+        """Test that a thread takes the lock again"""
+        with self.lock.read():
+            with self.lock.read():
+                pass
+        with self.lock.write():
+            with self.lock.write():
+                with self.lock.read():
+                    pass
+        with self.lock.write():
+            pass
+
+    def test_no_upgrade(self):
+        """Test that a reader cannot write"""
+        with self.lock.read():
+            with self.assertRaises(RuntimeError):
+                with self.lock.write():
+                    pass
+        with self.lock.write():
+            pass
@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+"""
+Contains the tests of the storage file formats
+"""
+
+import io
+import lzma
+import os
+import pep8
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from models.engine import serializers
+
+
+class TestSerializersDocs(unittest.TestCase):
+    """Tests to check the documentation and style of serializers"""
+    def test_pep8_conformance(self):
+        """Test that serializers.py and its tests conform to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files([
+            'models/engine/serializers.py',
+            'tests/test_models/test_engine/test_serializers.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_module_docstring(self):
+        """Test for the serializers.py module docstring"""
+        self.assertTrue(serializers.__doc__)
+
+
+class TestFormats(unittest.TestCase):
+    """Test the formats and the converter"""
+    records = {"State.{}".format(i): {"__class__": "State", "id": str(i),
+                                      "name": "s" * i}
+               for i in range(2500)}
+
+    def test_round_trip(self):
+        """Test that each format reads back what it wrote"""
+        for name, fmt in serializers.formats.items():
+            with self.subTest(format=name):
+                f = io.BytesIO() if fmt.binary else io.StringIO()
+                fmt.dump(self.records, f)
+                f.seek(0)
+                self.assertEqual(dict(fmt.iter_items(f)), self.records)
+
+    def test_pickle_forbids_globals(self):
+        """Test that pickled files cannot import anything"""
+        f = io.BytesIO(pickle.dumps([("a", {"b": os.getcwd})]))
+        with self.assertRaises(pickle.UnpicklingError):
+            list(serializers.PickleFormat.iter_items(f))
+
+    def test_convert(self):
+        """Test that convert rewrites a file in the other format"""
+        tmp = tempfile.mkdtemp()
+        try:
+            source = os.path.join(tmp, "file.json")
+            destination = os.path.join(tmp, "file.pickle")
+            with open(source, "w") as f:
+                serializers.JSONFormat.dump(self.records, f)
+            self.assertEqual(serializers.convert(source, destination),
+                             len(self.records))
+            with open(destination, "rb") as f:
+                self.assertEqual(
+                    dict(serializers.PickleFormat.iter_items(f)),
+                    self.records)
+            with self.assertRaises(ValueError):
+                serializers.convert(source, os.path.join(tmp, "file.txt"))
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_convert_command(self):
+        """Test that the converter runs without creating the storage"""
+        tmp = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(tmp, "file.json"), "w") as f:
+                serializers.JSONFormat.dump(self.records, f)
+            root = os.path.dirname(os.path.dirname(serializers.__file__))
+            env = dict(os.environ, PYTHONPATH=os.path.dirname(root))
+            subprocess.run([sys.executable, "-m", "models.engine.serializers",
+                            "file.json", "file.pickle"], cwd=tmp, env=env,
+                           check=True, stdout=subprocess.DEVNULL)
+            # reloading a FileStorage would have created file.json.lock
+            self.assertEqual(sorted(os.listdir(tmp)),
+                             ["file.json", "file.pickle"])
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_format_of(self):
+        """Test that format_of reads the format and compression"""
+        self.assertEqual(serializers.format_of("a/file.json"),
+                         (serializers.JSONFormat, "none"))
+        self.assertEqual(serializers.format_of("file.pickle.xz"),
+                         (serializers.PickleFormat, "lzma"))
+        with self.assertRaises(ValueError):
+            serializers.format_of("file.gz")
+
+    def test_convert_compressed(self):
+        """Test that convert compresses and decompresses files"""
+        tmp = tempfile.mkdtemp()
+        try:
+            paths = [os.path.join(tmp, name) for name in
+                     ["file.json", "file.json.gz", "file.pickle.bz2",
+                      "file.json.xz"]]
+            with open(paths[0], "w") as f:
+                serializers.JSONFormat.dump(self.records, f)
+            for source, destination in zip(paths, paths[1:]):
+                serializers.convert(source, destination)
+            with lzma.open(paths[-1], "rt") as f:
+                self.assertEqual(dict(serializers.JSONFormat.iter_items(f)),
+                                 self.records)
+        finally:
+            shutil.rmtree(tmp)
@@ -0,0 +1,227 @@
+#!/usr/bin/python3
+"""
+Contains the TestSQLiteStorageDocs and TestSQLiteStorage classes
+"""
+
+import inspect
+import models
+from models.engine import sqlite_storage
+from models.engine.db_storage import DBStorage
+import os
+import pep8
+import shutil
+import sqlite3
+import tempfile
+import unittest
+SQLiteStorage = sqlite_storage.SQLiteStorage
+
+
+class TestSQLiteStorageDocs(unittest.TestCase):
+    """Tests to check the documentation and style of SQLiteStorage class"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.sqls_f = inspect.getmembers(SQLiteStorage, inspect.isfunction)
+
+    def test_pep8_conformance_sqlite_storage(self):
+        """Test that models/engine/sqlite_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/sqlite_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_sqlite_storage(self):
+        """Test tests/test_models/test_sqlite_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_sqlite_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_sqlite_storage_module_docstring(self):
+        """Test for the sqlite_storage.py module docstring"""
+        self.assertIsNot(sqlite_storage.__doc__, None,
+                         "sqlite_storage.py needs a docstring")
+        self.assertTrue(len(sqlite_storage.__doc__) >= 1,
+                        "sqlite_storage.py needs a docstring")
+
+    def test_sqlite_storage_class_docstring(self):
+        """Test for the SQLiteStorage class docstring"""
+        self.assertIsNot(SQLiteStorage.__doc__, None,
+                         "SQLiteStorage class needs a docstring")
+        self.assertTrue(len(SQLiteStorage.__doc__) >= 1,
+                        "SQLiteStorage class needs a docstring")
+
+    def test_sqls_func_docstrings(self):
+        """Test for the presence of docstrings in SQLiteStorage methods"""
+        for func in self.sqls_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+            self.assertTrue(len(func[1].__doc__) >= 1,
+                            "{:s} method needs a docstring".format(func[0]))
+
+
+@unittest.skipIf(not isinstance(models.storage, SQLiteStorage),
+                 "not testing sqlite storage")
+class TestSQLiteStorage(unittest.TestCase):
+    """Test the SQLiteStorage class on a temporary database"""
+    def setUp(self):
+        """Open a storage on an empty temporary database"""
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "hbnb.db")
+        self.storage = SQLiteStorage(self.path)
+        self.storage.reload()
+
+    def tearDown(self):
+        """Close the storage and remove the database"""
+        self.storage.close()
+        shutil.rmtree(self.tmp)
+
+    def test_is_db_storage(self):
+        """Test that SQLiteStorage is a DBStorage"""
+        self.assertIsInstance(self.storage, DBStorage)
+
+    def test_wal_and_indexes(self):
+        """Test that the database is in WAL mode with foreign key indexes"""
+        db = sqlite3.connect(self.path)
+        try:
+            mode = db.execute("PRAGMA journal_mode").fetchone()[0]
+            names = {row[0] for row in db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'")}
+        finally:
+            db.close()
+        self.assertEqual(mode, "wal")
+        for name in ["ix_cities_state_id", "ix_places_city_id",
+                     "ix_places_user_id", "ix_reviews_place_id",
+                     "ix_reviews_user_id", "ix_place_amenity_amenity_id"]:
+            self.assertIn(name, names)
+
+    def test_new_save_get_count(self):
+        """Test that saved objects are counted and read back"""
+        from models.city import City
+        from models.state import State
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        city = City(name="San Francisco", state_id=state.id)
+        self.storage.new(city)
+        self.storage.save()
+        self.assertIs(self.storage.get(State, state.id), state)
+        self.assertIs(self.storage.get("City", city.id), city)
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(self.storage.count(City), 1)
+        self.assertEqual(list(self.storage.all(City)), ["City." + city.id])
+        self.storage.close()
+        self.storage.reload()
+        self.assertEqual(self.storage.get(City, city.id).name,
+                         "San Francisco")
+
+    def test_delete(self):
+        """Test that a deleted object is gone after save"""
+        from models.amenity import Amenity
+        amenity = Amenity(name="Wifi")
+        self.storage.new(amenity)
+        self.storage.save()
+        self.storage.delete(amenity)
+        self.storage.save()
+        self.assertIsNone(self.storage.get(Amenity, amenity.id))
+        self.assertEqual(self.storage.count(Amenity), 0)
+
+    def test_each(self):
+        """Test that each fetches the matching rows by batches"""
+        from models.city import City
+        from models.state import State
+        state = State(name="California")
+        self.storage.new(state)
+        cities = [City(name=str(i), state_id=state.id) for i in range(5)]
+        for city in cities:
+            self.storage.new(city)
+        self.storage.save()
+        pool = self.storage._DBStorage__engine.pool
+        checked_out = pool.checkedout()
+        self.assertEqual({city.id for city in self.storage.each(
+            City, batch=2)}, {city.id for city in cities})
+        self.assertEqual(list(self.storage.each(
+            City, {"state_id": "missing"})), [])
+        self.assertEqual(list(self.storage.each("Nothing")), [])
+        # the rows are read through a session of their own, given back
+        # once read, or dropped, even after the storage was closed
+        objs = self.storage.each(City, batch=2)
+        self.storage.close()
+        next(objs)
+        self.assertEqual(pool.checkedout(), checked_out + 1)
+        objs.close()
+        self.assertEqual(pool.checkedout(), checked_out)
+
+    def test_snapshot(self):
+        """Test that snapshot returns the objects read only"""
+        from models.state import State
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        snapshot = self.storage.snapshot(State)
+        self.assertEqual(dict(snapshot), {"State." + state.id: state})
+        with self.assertRaises(TypeError):
+            snapshot["State.x"] = state
+
+    def test_query(self):
+        """Test that query filters, sorts and pages in SQL"""
+        from models.city import City
+        from models.state import State
+        a, b = State(name="A"), State(name="B")
+        self.storage.new(a)
+        self.storage.new(b)
+        self.storage.save()
+        cities = []
+        for i in range(6):
+            city = City(name=str(i), state_id=(a, b)[i % 2].id)
+            self.storage.new(city)
+            cities.append(city)
+        self.storage.save()
+        self.assertEqual(set(self.storage.query(
+            "City", where={"state_id": a.id})), set(cities[::2]))
+        self.assertEqual(set(self.storage.query(
+            City, where={"state_id": [a.id, b.id], "name": ["1", "2"]})),
+            set(cities[1:3]))
+        self.assertEqual(self.storage.query(City, where={"state_id": []}),
+                         [])
+        names = [city.name for city in self.storage.query(
+            City, where={"state_id": b.id}, order_by="-name", limit=2,
+            offset=1)]
+        self.assertEqual(names, ["3", "1"])
+        names = [city.name for city in self.storage.query(
+            City, order_by=["state_id", "name"])]
+        self.assertEqual(sorted(names[:3]), names[:3])
+        self.assertEqual(self.storage.query("Nothing"), [])
+        names = [city.name for city in self.storage.query(
+            City, order_by=["state_id", "-name"],
+            after=(cities[4].state_id, "4"))]
+        first, second = sorted([a.id, b.id])
+        expected = ["2", "0"] + (["5", "3", "1"] if first == a.id else [])
+        self.assertEqual(names, expected)
+
+    def test_query_relationship(self):
+        """Test that a relationship matches the rows related to every id"""
+        from models.amenity import Amenity
+        from models.city import City
+        from models.place import Place
+        from models.state import State
+        from models.user import User
+        state = State(name="California")
+        city = City(name="Fresno", state_id=state.id)
+        user = User(email="a@b.c")
+        user.password = "pwd"
+        wifi, pool = Amenity(name="Wifi"), Amenity(name="Pool")
+        places = [Place(name=str(i), city_id=city.id, user_id=user.id)
+                  for i in range(3)]
+        places[1].amenities.append(wifi)
+        places[2].amenities.extend([wifi, pool])
+        for obj in [state, city, user, wifi, pool] + places:
+            self.storage.new(obj)
+            self.storage.save()
+        self.assertEqual(set(self.storage.query(
+            Place, where={"amenities": wifi.id})), set(places[1:]))
+        self.assertEqual(self.storage.query(
+            Place, where={"amenities": [wifi.id, pool.id]}), [places[2]])
+        self.assertEqual(list(self.storage.each(
+            Place, {"amenities": [pool.id], "city_id": "missing"})), [])
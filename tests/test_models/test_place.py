@@ -171,6 +171,14 @@ class TestPlace(unittest.TestCase):
         self.assertEqual(type(place.amenity_ids), list)
         self.assertEqual(len(place.amenity_ids), 0)
 
+    @unittest.skipIf(models.storage_t == 'db', "not testing File Storage")
+    def test_amenity_ids_not_shared(self):
+        """Test that each Place has its own amenity_ids list"""
+        place = Place()
+        place.amenity_ids.append("1")
+        self.assertEqual(Place().amenity_ids, [])
+        self.assertEqual(place.to_dict()["amenity_ids"], ["1"])
+
     def test_to_dict_creates_dict(self):
         """test to_dict method creates a dictionary with proper attrs"""
         p = Place()
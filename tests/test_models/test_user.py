@@ -4,6 +4,7 @@ Contains the TestUserDocs classes
 """
 
 from datetime import datetime
+import hashlib
 import inspect
 import models
 from models import user
@@ -85,6 +86,15 @@ class TestUser(unittest.TestCase):
         else:
             self.assertEqual(user.password, "")
 
+    def test_password_hashed(self):
+        """Test that a password given or set is stored hashed"""
+        digest = hashlib.md5(b"secret").hexdigest()
+        user = User(password="secret")
+        self.assertEqual(user.password, digest)
+        user = User()
+        user.password = "secret"
+        self.assertEqual(user.password, digest)
+
     def test_first_name_attr(self):
         """Test that User has attr first_name, and it's an empty string"""
         user = User()